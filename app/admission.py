@@ -0,0 +1,211 @@
+"""
+Admission control for the inference endpoints.
+
+At most ``max_in_flight`` requests run at once (sized to the cores a worker
+owns) and at most ``max_queue`` wait for a slot; beyond that requests are shed
+immediately with 503 and a Retry-After estimate instead of piling up in the
+threadpool. Each request carries a deadline, taken from the client's
+``X-Request-Timeout-Ms`` header (a positive number, capped at a server
+maximum) or a server default. A request whose deadline
+passes, or can't be met given the queue ahead of it, is answered 504 without
+running; once running, handlers call ``check_deadline()`` between stages so
+expired work stops early.
+
+Limits come from MAX_IN_FLIGHT / MAX_QUEUE, REQUEST_TIMEOUT_MS sets the default
+deadline, MAX_REQUEST_TIMEOUT_MS the longest one a client may ask for, and
+ADMISSION_CONTROL=0 turns the layer off.
+"""
+import asyncio
+import collections
+import contextvars
+import math
+import os
+import time
+
+import numpy as np
+
+TIMEOUT_HEADER = "X-Request-Timeout-Ms"
+QUEUE_WAIT_HEADER = "X-Queue-Wait-Ms"
+DEFAULT_TIMEOUT_MS = float(os.getenv("REQUEST_TIMEOUT_MS", "30000"))
+MAX_TIMEOUT_MS = float(os.getenv("MAX_REQUEST_TIMEOUT_MS", "120000"))
+
+_deadline = contextvars.ContextVar("request_deadline", default=None)
+
+
+class Overloaded(Exception):
+    """Request shed before running; status_code is 503 (saturated) or 504 (deadline)"""
+
+    def __init__(self, status_code, message, retry_after):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(Exception):
+    """The request's deadline passed while it was running"""
+
+
+def available_cores():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def limits_from_env(default_in_flight):
+    """(max_in_flight, max_queue), environment overrides first"""
+    max_in_flight = int(os.getenv("MAX_IN_FLIGHT", default_in_flight))
+    max_queue = int(os.getenv("MAX_QUEUE", 4 * max_in_flight))
+    return max(1, max_in_flight), max(0, max_queue)
+
+
+def parse_timeout_ms(value):
+    """Deadline budget in ms from the header value (None: the default), capped at MAX_TIMEOUT_MS
+
+    Raises ValueError unless the value is a positive, finite number.
+    """
+    timeout_ms = DEFAULT_TIMEOUT_MS if value is None else float(value)
+    if not math.isfinite(timeout_ms) or timeout_ms <= 0:
+        raise ValueError(f"{TIMEOUT_HEADER} must be a positive number of milliseconds")
+    return min(timeout_ms, MAX_TIMEOUT_MS)
+
+
+def set_deadline(deadline):
+    return _deadline.set(deadline)
+
+
+def reset_deadline(token):
+    _deadline.reset(token)
+
+
+def remaining_seconds():
+    """Time left before this request's deadline, or None without one"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def check_deadline(stage=""):
+    """Raise DeadlineExceeded when the current request is out of time"""
+    remaining = remaining_seconds()
+    if remaining is not None and remaining <= 0:
+        raise DeadlineExceeded(f"Deadline exceeded before {stage}" if stage else "Deadline exceeded")
+
+
+class AdmissionController:
+    """Bounded in-flight limit with a bounded FIFO wait queue, on one event loop
+
+    acquire() and release() must be called from the event loop thread; the
+    work itself may run anywhere.
+    """
+
+    def __init__(self, max_in_flight, max_queue, smoothing=0.05, window=2048):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self._smoothing = smoothing
+        self._waiters = collections.deque()
+        self.in_flight = 0
+        self.service_ms = None  # moving average time a request holds its slot
+        self.admitted = 0
+        self.queued = 0
+        self.shed_queue_full = 0
+        self.shed_deadline = 0
+        self.expired_running = 0
+        self._waits_ms = collections.deque(maxlen=window)
+
+    def resize(self, max_in_flight, max_queue):
+        """Change the limits, e.g. once a forked worker knows its share of cores"""
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+
+    def expected_wait(self, position):
+        """Seconds until the request at this queue position (0 = next) gets a slot"""
+        return (position + 1) / self.max_in_flight * (self.service_ms or 0.0) / 1000
+
+    def retry_after(self):
+        return max(1, math.ceil(self.expected_wait(len(self._waiters))))
+
+    async def acquire(self, deadline=None):
+        """Wait for a slot and return the seconds spent queued, or raise Overloaded"""
+        start = time.monotonic()
+        if deadline is not None and deadline <= start:
+            self.shed_deadline += 1
+            raise Overloaded(504, "Deadline already passed", self.retry_after())
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            self._admit(0.0)
+            return 0.0
+        if len(self._waiters) >= self.max_queue:
+            self.shed_queue_full += 1
+            raise Overloaded(503, "Server saturated, retry later", self.retry_after())
+
+        remaining = None if deadline is None else deadline - start
+        if remaining is not None and remaining <= self.expected_wait(len(self._waiters)):
+            self.shed_deadline += 1
+            raise Overloaded(504, "Deadline can't be met with the current queue", self.retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued += 1
+        try:
+            await asyncio.wait_for(waiter, remaining)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # A slot was handed over just as we gave up; pass it on
+                self.release()
+            else:
+                waiter.cancel()
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self.shed_deadline += 1
+            raise Overloaded(504, "Deadline exceeded while queued", self.retry_after()) from None
+
+        waited = time.monotonic() - start
+        self._admit(waited)
+        return waited
+
+    def release(self, service_seconds=None):
+        """Free a slot, handing it straight to the oldest live waiter if any"""
+        if service_seconds is not None:
+            ms = service_seconds * 1000
+            if self.service_ms is None:
+                self.service_ms = ms
+            else:
+                self.service_ms += self._smoothing * (ms - self.service_ms)
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def record_expired(self):
+        self.expired_running += 1
+
+    def _admit(self, waited):
+        self.admitted += 1
+        self._waits_ms.append(waited * 1000)
+
+    def snapshot(self):
+        waits = np.array(self._waits_ms) if self._waits_ms else np.zeros(1)
+        return {
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queue_length": len(self._waiters),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "shed_queue_full": self.shed_queue_full,
+            "shed_deadline": self.shed_deadline,
+            "expired_running": self.expired_running,
+            "avg_service_ms": self.service_ms,
+            "queue_wait_ms": {
+                "mean": float(waits.mean()),
+                "p50": float(np.percentile(waits, 50)),
+                "p99": float(np.percentile(waits, 99)),
+                "max": float(waits.max()),
+            },
+        }
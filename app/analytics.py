@@ -0,0 +1,259 @@
+"""
+Top-k / bottom-k product analytics.
+
+Live version of notebooks/least_selling_products_analysis.ipynb. Metric columns
+are computed once as NumPy arrays. Queries are answered from small bounded heaps
+kept per (metric, category, direction); heaps are built with ``np.argpartition``
+on first use and maintained incrementally as product sales are updated, so no
+query ever sorts the catalog. The notebook's "bottom 20%" filter is
+``quantile_filter``: the threshold needs one O(n) partition of the metric, the
+products below it come from the heaps.
+"""
+import heapq
+import threading
+
+import numpy as np
+
+SALES_PREFIX = "sales_month_"
+
+# metric -> (ranking key, description). Percentages are monotonic rescalings of
+# their key by the catalog maximum, so they rank by the raw key and are
+# rescaled only for the k rows returned.
+METRICS = {
+    "selling_percentage": ("total_sales", "Total sales as % of the best seller"),
+    "price_adjusted_selling_percentage": ("sales_per_dollar", "Sales per dollar as % of the best"),
+    "total_sales": ("total_sales", "Units sold over 12 months"),
+    "avg_monthly_sales": ("avg_monthly_sales", "Mean monthly units"),
+    "sales_per_dollar": ("sales_per_dollar", "Units sold per dollar of price"),
+    "sales_variability": ("sales_variability", "Std of monthly units"),
+    "review_score": ("review_score", "Average review score"),
+    "review_count": ("review_count", "Number of reviews"),
+}
+
+_PERCENTAGES = {"selling_percentage", "price_adjusted_selling_percentage"}
+
+
+def _sales_metrics(monthly, price):
+    total = monthly.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        per_dollar = np.where(price > 0, total / price, 0.0)
+    return {
+        "total_sales": total,
+        "avg_monthly_sales": monthly.mean(axis=1),
+        "sales_variability": monthly.std(axis=1, ddof=1) if monthly.shape[1] > 1 else np.zeros(len(monthly)),
+        "sales_per_dollar": per_dollar,
+    }
+
+
+class ProductRanking:
+    """Bounded-heap top-k / bottom-k index over a product catalog
+
+    ``heap_size`` caps the k a heap answers; larger k fall back to argpartition.
+    """
+
+    def __init__(self, df, heap_size=1000):
+        self.heap_size = heap_size
+        self._lock = threading.Lock()
+
+        self.product_id = df["product_id"].to_numpy()
+        self.product_name = df["product_name"].to_numpy()
+        self.categories, self.category_code = np.unique(df["category"].astype(str).to_numpy(), return_inverse=True)
+        # Own copies of the columns updates write to: to_numpy() may return a
+        # read-only (copy-on-write) or shared view of the caller's frame
+        self.price = df["price"].to_numpy(dtype=np.float64, copy=True)
+
+        sales_cols = [c for c in df.columns if c.startswith(SALES_PREFIX)]
+        self.monthly = df[sales_cols].to_numpy(dtype=np.float64, copy=True)
+
+        self.keys = _sales_metrics(self.monthly, self.price)
+        self.keys["review_score"] = df["review_score"].to_numpy(dtype=np.float64)
+        self.keys["review_count"] = df["review_count"].to_numpy(dtype=np.float64)
+
+        self._row_of = {pid: i for i, pid in enumerate(self.product_id.tolist())}
+        self._category_rows = [np.flatnonzero(self.category_code == c) for c in range(len(self.categories))]
+        self._version = np.zeros(len(df), dtype=np.int64)
+        # (key name, category code or -1, "top"/"bottom") -> heap of (score, row, version)
+        self._heaps = {}
+        self._max = {}
+
+    def __len__(self):
+        return len(self.product_id)
+
+    # ------------------- queries -------------------
+    def query(self, metric, k=10, direction="bottom", category=None):
+        """The k lowest (direction="bottom") or highest ("top") products by metric"""
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric '{metric}'. Available: {sorted(METRICS)}")
+        if direction not in ("top", "bottom"):
+            raise ValueError("direction must be 'top' or 'bottom'")
+        code = self._category_code(category)
+        key = METRICS[metric][0]
+
+        with self._lock:
+            return self._query(metric, key, code, k, direction)
+
+    def quantile_filter(self, metric, q=0.2, k=10, direction="bottom", category=None):
+        """Products at or below the q-quantile of metric (direction="bottom"), or at or above
+        the (1 - q)-quantile ("top"), as the notebook's bottom-20% filter
+
+        Returns the threshold, how many products pass it and the k most extreme of them.
+        """
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric '{metric}'. Available: {sorted(METRICS)}")
+        if direction not in ("top", "bottom"):
+            raise ValueError("direction must be 'top' or 'bottom'")
+        if not 0 < q < 1:
+            raise ValueError("q must be between 0 and 1")
+        code = self._category_code(category)
+        key = METRICS[metric][0]
+
+        with self._lock:
+            rows = self._rows(code)
+            values = self.keys[key] if rows is None else self.keys[key][rows]
+            if not len(values):
+                return {"threshold": None, "count": 0, "products": []}
+            if direction == "bottom":
+                threshold = float(np.quantile(values, q))
+                count = int((values <= threshold).sum())
+            else:
+                threshold = float(np.quantile(values, 1 - q))
+                count = int((values >= threshold).sum())
+            # Every product past the threshold ranks ahead of every other one
+            products = self._query(metric, key, code, min(k, count), direction)
+            if metric in _PERCENTAGES:
+                threshold *= 100.0 / self._key_max(key)
+        return {"threshold": threshold, "count": count, "products": products}
+
+    def monthly_sales(self, rows):
+        """Copy of the monthly sales of these rows, consistent with concurrent updates"""
+        with self._lock:
+            return self.monthly[rows]
+
+    def _query(self, metric, key, code, k, direction):
+        k = min(k, self._row_count(code))
+        if k > self.heap_size:
+            ranked = self._select(key, self._rows(code), k, direction)
+        else:
+            ranked = self._from_heap(key, code, k, direction)
+        scale = 100.0 / self._key_max(key) if metric in _PERCENTAGES else None
+        values = self.keys[key][ranked]
+        return [self._describe(row, metric, value * scale if scale is not None else value)
+                for row, value in zip(ranked.tolist(), values.tolist())]
+
+    def _category_code(self, category):
+        if category is None:
+            return -1
+        match = np.flatnonzero(np.char.lower(self.categories.astype(str)) == category.lower())
+        if not len(match):
+            raise KeyError(f"Unknown category '{category}'. Available: {self.categories.tolist()}")
+        return int(match[0])
+
+    def _rows(self, code):
+        """Rows of one category, or None for the whole catalog (no index array to allocate)"""
+        return self._category_rows[code] if code >= 0 else None
+
+    def _row_count(self, code):
+        return len(self._category_rows[code]) if code >= 0 else len(self)
+
+    def _select(self, key, rows, k, direction):
+        """argpartition the k extreme rows (None: all), then sort only those k"""
+        values = self.keys[key] if rows is None else self.keys[key][rows]
+        if direction == "top":
+            values = -values
+        if k < len(values):
+            part = np.argpartition(values, k - 1)[:k]
+        else:
+            part = np.arange(len(values))
+        ranked = part[np.argsort(values[part], kind="stable")]
+        return ranked if rows is None else rows[ranked]
+
+    def _from_heap(self, key, code, k, direction):
+        heap_key = (key, code, direction)
+        heap = self._heaps.get(heap_key)
+        valid = self._valid_entries(heap) if heap is not None else []
+        # Updates leave stale entries behind; rebuild once too few valid ones remain
+        if len(valid) < k:
+            heap = self._build_heap(key, code, direction)
+            self._heaps[heap_key] = heap
+            valid = heap
+        best = heapq.nlargest(k, valid)
+        return np.fromiter((row for _, row, _ in best), dtype=np.int64, count=len(best))
+
+    def _valid_entries(self, heap):
+        version = self._version
+        return [entry for entry in heap if version[entry[1]] == entry[2]]
+
+    def _build_heap(self, key, code, direction):
+        ranked = self._select(key, self._rows(code), min(self.heap_size, self._row_count(code)), direction)
+        sign = 1.0 if direction == "top" else -1.0
+        heap = [(sign * v, r, int(self._version[r])) for r, v in zip(ranked.tolist(), self.keys[key][ranked].tolist())]
+        heapq.heapify(heap)
+        return heap
+
+    def _key_max(self, key):
+        if key not in self._max:
+            self._max[key] = float(self.keys[key].max()) if len(self) else 0.0
+        return self._max[key] or 1.0
+
+    def _describe(self, row, metric, value):
+        return {
+            "product_id": self.product_id[row].item(),
+            "product_name": str(self.product_name[row]),
+            "category": str(self.categories[self.category_code[row]]),
+            "price": float(self.price[row]),
+            "total_sales": float(self.keys["total_sales"][row]),
+            metric: round(float(value), 4),
+        }
+
+    # ------------------- incremental updates -------------------
+    def update_product(self, product_id, monthly_sales=None, price=None):
+        """Apply new monthly sales and/or price to one product, maintaining every built heap
+
+        All values are validated before anything changes, so a rejected update
+        leaves the product as it was.
+        """
+        try:
+            row = self._row_of[product_id]
+        except KeyError:
+            raise KeyError(f"Unknown product_id {product_id}") from None
+        if monthly_sales is not None:
+            monthly_sales = np.asarray(monthly_sales, dtype=np.float64)
+            if monthly_sales.shape != (self.monthly.shape[1],):
+                raise ValueError(f"Expected {self.monthly.shape[1]} monthly values")
+            if not (np.isfinite(monthly_sales).all() and (monthly_sales >= 0).all()):
+                raise ValueError("monthly_sales must be finite and non-negative")
+        if price is not None:
+            price = float(price)
+            if not (np.isfinite(price) and price >= 0):
+                raise ValueError("price must be finite and non-negative")
+
+        with self._lock:
+            new_monthly = self.monthly[row] if monthly_sales is None else monthly_sales
+            new_price = self.price[row] if price is None else price
+            metrics = _sales_metrics(new_monthly[None, :], np.array([new_price]))
+
+            self.monthly[row] = new_monthly
+            self.price[row] = new_price
+            old = {name: self.keys[name][row] for name in ("total_sales", "sales_per_dollar")}
+            for name, values in metrics.items():
+                self.keys[name][row] = values[0]
+            for name, old_value in old.items():
+                # A shrinking maximum needs a rescan, a growing one is known
+                current = self._max.get(name)
+                if current is not None and (self.keys[name][row] > current or old_value == current):
+                    self._max.pop(name)
+
+            self._version[row] += 1
+            version = int(self._version[row])
+            code = int(self.category_code[row])
+            for (key, heap_code, direction), heap in self._heaps.items():
+                if heap_code not in (-1, code):
+                    continue
+                score = self.keys[key][row] if direction == "top" else -self.keys[key][row]
+                entry = (score, row, version)
+                if len(heap) < min(self.heap_size, self._row_count(heap_code)):
+                    heapq.heappush(heap, entry)
+                elif score > heap[0][0]:
+                    heapq.heapreplace(heap, entry)
+
+        return self._describe(row, "total_sales", self.keys["total_sales"][row])
@@ -3,19 +3,67 @@ import pandas as pd
 import numpy as np
 import torch
 from transformers import AutoTokenizer, AutoModel
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import HTMLResponse
-from pydantic import BaseModel
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse
+from pydantic import BaseModel, ValidationError
+from typing import List, Optional
 import os
+import time
+
+from app.admission import (QUEUE_WAIT_HEADER, TIMEOUT_HEADER, AdmissionController, DeadlineExceeded, Overloaded,
+                           available_cores, check_deadline, limits_from_env, parse_timeout_ms, reset_deadline,
+                           set_deadline)
+from app.analytics import METRICS, ProductRanking
+from app.bulk import (ARROW_STREAM, ModelLayout, ProductCatalog, batch_features, check_feature_scaling,
+                      json_columns, json_results, load_feature_scaling, names_at, raw_feature_values,
+                      read_arrow_columns, write_arrow_results)
+from app.cascade import CascadeStats, StageTimer, load_cascade_bands, should_exit_early, xgb_used_features
+from app.drift import DriftMonitor, load_drift_baseline
+from app.forecasting import FORECAST_METHODS, forecast
+from app.reduction import load_embedding_projection, project_embeddings
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-# Load optimized models with cross-validation and hyperparameter tuning
-xgb_model = joblib.load(os.path.join(BASE_DIR, "../models/optimized/xgboost_optimized.pkl"))
-mlp_model = joblib.load(os.path.join(BASE_DIR, "../models/optimized/neural_network_optimized.pkl"))
-meta_model = joblib.load(os.path.join(BASE_DIR, "../models/optimized/meta_model_optimized.pkl"))
+# Load optimized models with cross-validation and hyperparameter tuning.
+# Weight arrays are memory-mapped read-only so forked workers (app/serve.py) share the pages.
+xgb_model = joblib.load(os.path.join(BASE_DIR, "../models/optimized/xgboost_optimized.pkl"), mmap_mode="r")
+mlp_model = joblib.load(os.path.join(BASE_DIR, "../models/optimized/neural_network_optimized.pkl"), mmap_mode="r")
+meta_model = joblib.load(os.path.join(BASE_DIR, "../models/optimized/meta_model_optimized.pkl"), mmap_mode="r")
+# Reduced-dimension embedding stage, present when the models were trained on projected embeddings
+embedding_projection = load_embedding_projection(os.path.join(BASE_DIR, "../models/optimized"))
+
+# Early-exit cascade, active once bands have been calibrated (CASCADE_ENABLED=0 forces the full ensemble)
+cascade_bands = None
+if os.getenv("CASCADE_ENABLED", "1") != "0":
+    cascade_bands = load_cascade_bands(os.path.join(BASE_DIR, "../models/optimized"))
+cascade_stats = CascadeStats()
+
+# Feature drift monitoring, active once the pipeline has saved a training baseline (DRIFT_MONITORING=0 disables)
+drift_monitor = None
+if os.getenv("DRIFT_MONITORING", "1") != "0":
+    drift_baseline = load_drift_baseline(os.path.join(BASE_DIR, "../models/optimized"))
+    if drift_baseline is not None:
+        drift_monitor = DriftMonitor(drift_baseline, interval=float(os.getenv("DRIFT_INTERVAL_S", "60")))
+
+# Model input columns are placed by the feature names the models were trained with
+EMBEDDING_DIM = embedding_projection["components"].shape[0] if embedding_projection is not None else 768
+model_layout = ModelLayout.from_model(xgb_model, EMBEDDING_DIM)
+if model_layout.unknown:
+    print(f"Model inputs the API doesn't compute, fed as 0: {model_layout.unknown}")
+# Scaler statistics and price terciles saved with the models; refuse to serve with another run's
+feature_scaling = load_feature_scaling(os.path.join(BASE_DIR, "../models/optimized"))
+check_feature_scaling(feature_scaling, model_layout)
+# The embedding can be skipped on early exits only if XGBoost never splits on it
+xgb_needs_embedding = bool(xgb_used_features(xgb_model) & set(model_layout.embedding_positions.tolist()))
 
 lookup_path = os.path.join(BASE_DIR, "../data/raw/ecommerce_sales.csv")
 lookup_df = pd.read_csv(lookup_path)
+# Top-k / bottom-k index for the analytics endpoints
+product_ranking = ProductRanking(lookup_df)
+# Precomputed business features per catalog product for /predict and /predict/batch
+product_catalog = ProductCatalog(lookup_df, feature_scaling)
+# Rows scored per block by /predict/batch, bounding the size of the model input matrix
+BATCH_BLOCK_ROWS = int(os.getenv("BATCH_BLOCK_ROWS", "4096"))
 
 model_name = "distilbert-base-uncased"  
 tokenizer = AutoTokenizer.from_pretrained(model_name)
@@ -25,6 +73,53 @@ bert_model.to(device)
 
 app = FastAPI(title="Product Success Prediction API")
 
+# ------------------- Admission control -------------------
+# Bounded concurrency and queueing for the CPU-heavy endpoints (app/admission.py).
+# app/serve.py resizes the limits to each forked worker's share of the cores.
+INFERENCE_PATHS = {"/predict", "/predict/batch"}
+admission = None
+if os.getenv("ADMISSION_CONTROL", "1") != "0":
+    admission = AdmissionController(*limits_from_env(available_cores()))
+
+@app.middleware("http")
+async def admission_control(request: Request, call_next):
+    if admission is None or request.url.path not in INFERENCE_PATHS:
+        return await call_next(request)
+    try:
+        timeout_ms = parse_timeout_ms(request.headers.get(TIMEOUT_HEADER))
+    except ValueError:
+        return JSONResponse(status_code=400,
+                            content={"detail": f"{TIMEOUT_HEADER} must be a positive number of milliseconds"})
+    deadline = time.monotonic() + timeout_ms / 1000
+
+    try:
+        waited = await admission.acquire(deadline)
+    except Overloaded as e:
+        return JSONResponse(status_code=e.status_code, content={"detail": str(e)},
+                            headers={"Retry-After": str(e.retry_after)})
+    token = set_deadline(deadline)
+    start = time.monotonic()
+    try:
+        response = await call_next(request)
+    finally:
+        reset_deadline(token)
+        admission.release(time.monotonic() - start)
+    response.headers[QUEUE_WAIT_HEADER] = f"{waited * 1000:.1f}"
+    return response
+
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exceeded(request: Request, exc: DeadlineExceeded):
+    if admission is not None:
+        admission.record_expired()
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
+
+@app.get("/admission/stats")
+def admission_statistics():
+    """In-flight and queue limits, queue-wait percentiles and shed counts for this worker"""
+    if admission is None:
+        return {"enabled": False}
+    return {"enabled": True, **admission.snapshot()}
+
 # ------------------- Home Page -------------------
 @app.get("/", response_class=HTMLResponse)
 async def home():
@@ -115,6 +210,15 @@ async def home():
 class ProductInput(BaseModel):
     product_name: str
 
+class ForecastInput(BaseModel):
+    product_name: str
+    horizon: int = 3
+    method: str = "ses"
+
+class SalesUpdate(BaseModel):
+    monthly_sales: Optional[List[float]] = None
+    price: Optional[float] = None
+
 def get_embedding(text):
     inputs = tokenizer(text, return_tensors="pt", truncation=True, padding=True, max_length=16)
     inputs = {k: v.to(device) for k, v in inputs.items()}
@@ -122,97 +226,326 @@ def get_embedding(text):
         outputs = bert_model(**inputs)
     return outputs.last_hidden_state[:, 0, :].cpu().numpy().flatten()
 
-def safe_get_value(row, col, default):
-    return row[col].values[0] if col in row.columns and not pd.isna(row[col].values[0]) else default
+def build_model_input(business_features, emb):
+    """One row (1-D arguments) or a batch of rows (2-D) of model input, in the training column order"""
+    return model_layout.build(np.atleast_2d(business_features), np.atleast_2d(emb))
+
+def embed_product_name(product_name):
+    emb = get_embedding(product_name)
+    if embedding_projection is not None:
+        emb = project_embeddings(embedding_projection, emb)
+    return emb
 
-def standardize_features(price, review_score, review_count, total_sales, avg_sales_per_month):
-    """Apply the same standardization used during training"""
-    # parameters from the training scaler
-    means = np.array([2.47677130e+02, 3.02760000e+00, 5.26506000e+02, 6.01991200e+03, 5.01659333e+02])
-    stds = np.array([144.53566113, 1.17065718, 282.12876132, 991.77752559, 82.64812713])
-    
-    raw_values = np.array([price, review_score, review_count, total_sales, avg_sales_per_month])
-    standardized = (raw_values - means) / stds
-    
-    return standardized
+def embed_product_names(names, batch_size=64):
+    """Embeddings for a list of product names, (n, EMBEDDING_DIM)"""
+    embeddings = []
+    for start in range(0, len(names), batch_size):
+        inputs = tokenizer(names[start:start + batch_size], return_tensors="pt", truncation=True, padding=True, max_length=16)
+        inputs = {k: v.to(device) for k, v in inputs.items()}
+        with torch.no_grad():
+            outputs = bert_model(**inputs)
+        embeddings.append(outputs.last_hidden_state[:, 0, :].cpu().numpy())
+    emb = np.concatenate(embeddings) if embeddings else np.zeros((0, 768), dtype=np.float32)
+    if embedding_projection is not None:
+        emb = project_embeddings(embedding_projection, emb)
+    return emb
+
+def time_skipped_stages(repeats=3):
+    """Best-of-``repeats`` ms of the stages a /predict early exit skips, on a catalog product"""
+    name = str(lookup_df["product_name"].iloc[0])
+    numeric_features = product_catalog.features[product_catalog.rows([name])[0]]
+    skip_embedding = not xgb_needs_embedding
+    combined_features = build_model_input(numeric_features, embed_product_name(name))
+    xgb_pred = xgb_model.predict_proba(combined_features)[:, 1]
+    best = None
+    for _ in range(repeats):
+        expensive = StageTimer()
+        with expensive:
+            if skip_embedding:
+                combined_features = build_model_input(numeric_features, embed_product_name(name))
+            mlp_pred = mlp_model.predict_proba(combined_features)[:, 1]
+            meta_model.predict_proba(np.column_stack((xgb_pred, mlp_pred)))
+        best = expensive.seconds if best is None else min(best, expensive.seconds)
+    return best * 1000
+
+# Early exits are credited with the measured cost from the first request on
+if cascade_bands is not None and len(lookup_df):
+    cascade_stats.seed(time_skipped_stages())
 
 @app.post("/predict")
 def predict(input_data: ProductInput):
     try:
         print(f"Received product: {input_data.product_name}")
 
-        # Lookup product
-        product_row = lookup_df[lookup_df['product_name'].str.lower() == input_data.product_name.lower()]
+        # Lookup product; features are computed per catalog row like the training data
+        row = product_catalog.rows([input_data.product_name])[0]
 
-        if product_row.empty:
+        if row < 0:
             return {
                 "error": "Product not found",
                 "product_name": input_data.product_name,
                 "message": f"The product '{input_data.product_name}' was not found in our database."
             }
-        
-        category = safe_get_value(product_row, 'category', "Clothing")
-        price = safe_get_value(product_row, 'price', 299.0)
-        review_score = safe_get_value(product_row, 'review_score', 4.0)
-        review_count = safe_get_value(product_row, 'review_count', 50)
-
-        monthly_cols = [col for col in product_row.columns if 'sales_month' in col]
-        if monthly_cols:
-            monthly_sales = product_row[monthly_cols].values.flatten()
-        else:
-            monthly_sales = np.array([40] * 12)
-
-        total_sales = monthly_sales.sum()
-        avg_sales = monthly_sales.mean()
-        sales_variability = monthly_sales.std()
-        sales_trend = (monthly_sales[-3:].mean() / monthly_sales[:3].mean()) if monthly_sales[:3].mean() > 0 else 1
-        price_bucket_low = 1 if price <= 200 else 0
-        price_bucket_high = 1 if price >= 500 else 0
-
-        standardized_features = standardize_features(price, review_score, review_count, total_sales, avg_sales)
-        std_price, std_review_score, std_review_count, std_total_sales, std_avg_sales = standardized_features
-
-        category_features = {
-            "Clothing": [1, 0, 0, 0, 0, 0],
-            "Electronics": [0, 1, 0, 0, 0, 0], 
-            "Health": [0, 0, 1, 0, 0, 0],
-            "Home & Kitchen": [0, 0, 0, 1, 0, 0],
-            "Sports": [0, 0, 0, 0, 1, 0],
-            "Toys": [0, 0, 0, 0, 0, 1],
-            "Books": [0, 0, 0, 0, 0, 0]  
-        }
-        cat_vector = category_features.get(category, [0, 0, 0, 0, 0, 0]) 
-
-        emb = get_embedding(input_data.product_name)
 
-        numeric_features = [
-            std_price, std_review_score, std_review_count, std_total_sales, std_avg_sales,  # Standardized features
-            sales_variability, sales_trend, price_bucket_low, price_bucket_high  # Non-standardized features
-        ] + cat_vector
-        combined_features = np.concatenate([numeric_features, emb]).reshape(1, -1)
+        category = product_catalog.category[row]
+        numeric_features = product_catalog.features[row]
 
-        required_features = 796  
-        current_features = combined_features.shape[1]
-        if current_features < required_features:
-            padding = np.zeros((1, required_features - current_features))
-            combined_features = np.hstack((combined_features, padding))
-        elif current_features > required_features:
-            combined_features = combined_features[:, :required_features]
+        # Stages an early exit skips are timed to estimate the latency the cascade saves
+        expensive = StageTimer()
+        skip_embedding = cascade_bands is not None and not xgb_needs_embedding
+        if skip_embedding:
+            emb = np.zeros(EMBEDDING_DIM)
+        else:
+            check_deadline("embedding")
+            emb = embed_product_name(input_data.product_name)
+        combined_features = build_model_input(numeric_features, emb)
 
         xgb_pred = xgb_model.predict_proba(combined_features)[:, 1]
-        mlp_pred = mlp_model.predict_proba(combined_features)[:, 1]
-        stack_input = np.column_stack((xgb_pred, mlp_pred))
-        final_pred_proba = meta_model.predict_proba(stack_input)[:, 1][0]
+
+        if cascade_bands is not None and should_exit_early(cascade_bands, xgb_pred[0]):
+            cascade_stats.record_exit()
+            final_pred_proba = xgb_pred[0]
+            stage = "xgboost"
+        else:
+            check_deadline("ensemble")
+            with expensive:
+                if skip_embedding:
+                    emb = embed_product_name(input_data.product_name)
+                    combined_features = build_model_input(numeric_features, emb)
+                mlp_pred = mlp_model.predict_proba(combined_features)[:, 1]
+                stack_input = np.column_stack((xgb_pred, mlp_pred))
+                final_pred_proba = meta_model.predict_proba(stack_input)[:, 1][0]
+            if cascade_bands is not None:
+                cascade_stats.record_full(expensive.seconds)
+            stage = "ensemble"
         final_pred_label = int(final_pred_proba >= 0.5)
+        if drift_monitor is not None:
+            drift_monitor.record(np.append(raw_feature_values(numeric_features[None, :], feature_scaling)[0], final_pred_proba))
 
         return {
             "product_name": input_data.product_name,
             "category": category,
             "success_probability": round(float(final_pred_proba), 4),
-            "prediction": "Success" if final_pred_label == 1 else "Fail"
+            "prediction": "Success" if final_pred_label == 1 else "Fail",
+            "stage": stage
         }
 
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Internal Error: {str(e)}")
+
+@app.get("/cascade/stats")
+def cascade_statistics():
+    """Short-circuit rate and estimated latency saved by the early-exit cascade in this worker"""
+    return {
+        "enabled": cascade_bands is not None,
+        "bands": cascade_bands,
+        "embedding_skippable": not xgb_needs_embedding,
+        **cascade_stats.snapshot()
+    }
+
+# ------------------- Bulk scoring -------------------
+def score_batch(numeric, names=None, emb=None):
+    """Run the cascade over a batch of rows, block by block
+
+    Returns success probabilities and the index into bulk.STAGES of the stage
+    that produced each. ``emb`` holds client-supplied embeddings; otherwise
+    names are embedded, only for rows that need it when the cascade allows.
+    """
+    n = len(numeric)
+    if emb is not None and embedding_projection is not None and emb.shape[1] == embedding_projection["components"].shape[1]:
+        emb = project_embeddings(embedding_projection, emb)
+    if emb is not None and emb.shape[1] != EMBEDDING_DIM:
+        raise ValueError(f"Expected {EMBEDDING_DIM} embedding columns, got {emb.shape[1]}")
+    if emb is None and names is None:
+        raise ValueError("Rows without embeddings need product_name")
+    skip_embedding = emb is None and cascade_bands is not None and not xgb_needs_embedding
+
+    proba = np.empty(n)
+    stage = np.zeros(n, dtype=np.int8)
+    for start in range(0, n, BATCH_BLOCK_ROWS):
+        check_deadline(f"row {start}")
+        rows = np.arange(start, min(start + BATCH_BLOCK_ROWS, n))
+        if emb is not None:
+            block_emb = emb[rows]
+        elif skip_embedding:
+            block_emb = np.zeros((len(rows), EMBEDDING_DIM))
+        else:
+            block_emb = embed_product_names(names_at(names, rows))
+        combined_features = build_model_input(numeric[rows], block_emb)
+        xgb_pred = xgb_model.predict_proba(combined_features)[:, 1]
+        proba[rows] = xgb_pred
+
+        if cascade_bands is not None:
+            full = ~((xgb_pred <= cascade_bands["low"]) | (xgb_pred >= cascade_bands["high"]))
+        else:
+            full = np.ones(len(rows), dtype=bool)
+        if not full.any():
+            cascade_stats.record_batch(len(rows), 0, 0.0)
+            continue
+
+        expensive = StageTimer()
+        with expensive:
+            if skip_embedding:
+                combined_features = build_model_input(numeric[rows[full]], embed_product_names(names_at(names, rows[full])))
+            else:
+                combined_features = combined_features[full]
+            mlp_pred = mlp_model.predict_proba(combined_features)[:, 1]
+            stack_input = np.column_stack((xgb_pred[full], mlp_pred))
+            proba[rows[full]] = meta_model.predict_proba(stack_input)[:, 1]
+        stage[rows[full]] = 1
+        if cascade_bands is not None:
+            cascade_stats.record_batch(int((~full).sum()), int(full.sum()), expensive.seconds)
+    return proba, stage
+
+def _score_columns(columns):
+    numeric, found = batch_features(columns, product_catalog)
+    names = columns["product_name"]
+    rows = np.flatnonzero(found)
+    proba = np.full(columns["n_rows"], np.nan)
+    stage = np.zeros(columns["n_rows"], dtype=np.int8)
+    if len(rows):
+        emb = columns["emb"][rows] if columns["emb"] is not None else None
+        found_names = names if names is None or found.all() else names.take(rows)
+        proba[rows], stage[rows] = score_batch(numeric, found_names, emb)
+        if drift_monitor is not None:
+            drift_monitor.record(np.column_stack((raw_feature_values(numeric, feature_scaling), proba[rows])))
+    return proba, stage, found
+
+@app.post("/predict/batch")
+async def predict_batch(request: Request):
+    """Score many products at once
+
+    The request body is JSON ({"products": [...]}) or an Arrow IPC stream
+    (Content-Type: application/vnd.apache.arrow.stream); the response is an Arrow
+    stream when the Accept header asks for one, JSON otherwise.
+    """
+    content_type = request.headers.get("content-type", "application/json").split(";")[0].strip().lower()
+    wants_arrow = ARROW_STREAM in request.headers.get("accept", "")
+    body = await request.body()
+    try:
+        if content_type == ARROW_STREAM:
+            columns = read_arrow_columns(body)
+        elif content_type == "application/json":
+            columns = json_columns(body)
+        else:
+            raise HTTPException(status_code=415, detail=f"Send application/json or {ARROW_STREAM}")
+        proba, stage, found = await run_in_threadpool(_score_columns, columns)
+        if wants_arrow:
+            return Response(content=write_arrow_results(proba, stage, found), media_type=ARROW_STREAM)
+        return Response(content=json_results(columns["product_name"], proba, stage, found), media_type="application/json")
+    except ImportError:
+        raise HTTPException(status_code=415, detail="Arrow bodies need pyarrow installed on the server")
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# ------------------- Drift monitoring -------------------
+@app.get("/drift")
+def drift_report():
+    """PSI / KS of live inputs and predictions against the training baseline, for this worker"""
+    if drift_monitor is None:
+        return {"enabled": False}
+    return {"enabled": True, **drift_monitor.snapshot()}
+
+@app.get("/drift/metrics", response_class=PlainTextResponse)
+def drift_metrics():
+    """Last scored window in the Prometheus text format"""
+    if drift_monitor is None:
+        return ""
+    return drift_monitor.prometheus()
+
+# ------------------- Analytics -------------------
+def _ranked_products(metric, k, direction, category, quantile=None):
+    try:
+        if quantile is None:
+            products = product_ranking.query(metric, k=k, direction=direction, category=category)
+            extra = {}
+        else:
+            extra = product_ranking.quantile_filter(metric, q=quantile, k=k, direction=direction, category=category)
+            products = extra.pop("products")
+            extra["quantile"] = quantile
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    return {"metric": metric, "category": category, **extra, "k": len(products), "products": products}
+
+@app.get("/analytics/metrics")
+def analytics_metrics():
+    return {name: description for name, (_, description) in METRICS.items()}
+
+@app.get("/analytics/underperformers")
+def underperformers(
+    metric: str = "selling_percentage",
+    k: int = Query(10, ge=1, le=10000),
+    category: Optional[str] = None,
+    quantile: Optional[float] = Query(None, gt=0, lt=1)
+):
+    """Bottom-k products by metric, optionally within one category
+
+    With ``quantile`` (e.g. 0.2 for the bottom 20%), also the metric's threshold
+    and how many products fall at or below it; the k returned are the lowest of them.
+    """
+    return _ranked_products(metric, k, "bottom", category, quantile)
+
+@app.get("/analytics/top-performers")
+def top_performers(
+    metric: str = "selling_percentage",
+    k: int = Query(10, ge=1, le=10000),
+    category: Optional[str] = None,
+    quantile: Optional[float] = Query(None, gt=0, lt=1)
+):
+    """Top-k products by metric, optionally within one category (``quantile``: the top share, as above)"""
+    return _ranked_products(metric, k, "top", category, quantile)
+
+@app.post("/analytics/products/{product_id}/sales")
+def update_product_sales(product_id: int, update: SalesUpdate):
+    """Record new monthly sales or price for a product; rankings update incrementally"""
+    try:
+        return product_ranking.update_product(product_id, monthly_sales=update.monthly_sales, price=update.price)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# ------------------- Forecasting -------------------
+@app.post("/forecast")
+def forecast_sales(input_data: ForecastInput):
+    """Forecast the next months of unit sales for every product with this name"""
+    if input_data.method not in FORECAST_METHODS:
+        raise HTTPException(status_code=400, detail=f"Unknown method '{input_data.method}'. Available: {sorted(FORECAST_METHODS)}")
+    if not 1 <= input_data.horizon <= 24:
+        raise HTTPException(status_code=400, detail="horizon must be between 1 and 24 months")
+
+    rows = np.flatnonzero(lookup_df['product_name'].str.lower().to_numpy() == input_data.product_name.lower())
+    if not len(rows):
+        return {
+            "error": "Product not found",
+            "product_name": input_data.product_name,
+            "message": f"The product '{input_data.product_name}' was not found in our database."
+        }
+
+    # Monthly sales from the analytics index include updates posted since startup
+    monthly_sales = product_ranking.monthly_sales(rows)
+    try:
+        predicted = forecast(monthly_sales, input_data.horizon, input_data.method)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "product_name": input_data.product_name,
+        "method": input_data.method,
+        "horizon": input_data.horizon,
+        "forecasts": [
+            {
+                "product_id": product_ranking.product_id[row].item(),
+                "monthly_sales": monthly_sales[i].tolist(),
+                "forecast": predicted[i].round(2).tolist()
+            }
+            for i, row in enumerate(rows.tolist())
+        ]
+    }
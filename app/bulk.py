@@ -0,0 +1,480 @@
+"""
+Bulk scoring: batch feature building and the binary (Arrow IPC) wire format.
+
+``POST /predict/batch`` accepts either JSON or an Arrow IPC stream
+(``Content-Type: application/vnd.apache.arrow.stream``) and answers in the
+format named by ``Accept``. Each row is either a product name, looked up in
+the catalog like ``/predict`` does, or a raw feature row with the catalog's
+columns (``price``, ``review_score``, ``review_count``, ``category``,
+``sales_month_1..12`` or a ``monthly_sales`` list column, optional
+``product_id`` and ``emb_*`` columns); a batch may mix both. Arrow columns are read straight from their buffers into NumPy, so
+building the model input creates no per-row Python objects; names become Python
+strings only for the rows that need a DistilBERT embedding.
+
+Both endpoints build the model input the same way: the business columns of
+the training frame (``BUSINESS_COLUMNS``) computed per catalog row, placed by
+feature name where the trained models expect them (``ModelLayout``), with the
+embedding in the ``emb_*`` columns. Standardization and price buckets use the
+statistics fitted in training, saved next to the models
+(``models/optimized/feature_scaling.json``).
+
+pyarrow is optional (``pip install ecom-predict[bulk]``); without it only the
+JSON variant is served.
+"""
+import json
+import os
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+from pydantic import BaseModel
+
+from app.reduction import EMBEDDING_PREFIX
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+SALES_PREFIX = "sales_month_"
+NUM_MONTHS = 12
+
+SCALING_FILENAME = "feature_scaling.json"
+# Columns the training scaler standardizes (stages.preprocess), in its order
+STANDARDIZED = ["price", "review_score", "review_count", "total_sales", "avg_sales_per_month"]
+
+# One-hot category order of the model input; Books is the reference level
+CATEGORIES = ["Clothing", "Electronics", "Health", "Home & Kitchen", "Sports", "Toys"]
+DEFAULT_CATEGORY = "Clothing"
+# Fallbacks /predict uses for missing catalog values (product_id 0: not a catalog product)
+DEFAULTS = {"product_id": 0.0, "price": 299.0, "review_score": 4.0, "review_count": 50.0, "monthly_sales": 40.0}
+
+# Columns of the training frame before the embedding (stages.featured minus
+# product_name and the success target), in training order
+BUSINESS_COLUMNS = (["product_id", "price", "review_score", "review_count"]
+                    + [f"{SALES_PREFIX}{m + 1}" for m in range(NUM_MONTHS)]
+                    + ["total_sales", "avg_sales_per_month"]
+                    + [f"category_{c}" for c in CATEGORIES]
+                    + ["sales_variability", "sales_trend", "price_bucket_Medium", "price_bucket_High"])
+RAW_FIELDS = ("price", "review_score", "review_count", "category", "monthly_sales")
+# Stage codes returned by batch scoring, indexes into this list
+STAGES = ["xgboost", "ensemble"]
+
+
+class BatchProduct(BaseModel):
+    product_name: Optional[str] = None
+    product_id: Optional[int] = None
+    category: Optional[str] = None
+    price: Optional[float] = None
+    review_score: Optional[float] = None
+    review_count: Optional[float] = None
+    # A null month is reported like a null sales_month_* Arrow value, not as a schema error
+    monthly_sales: Optional[List[Optional[float]]] = None
+    embedding: Optional[List[float]] = None
+
+
+class BatchInput(BaseModel):
+    products: List[BatchProduct]
+
+
+def category_codes(values):
+    """Index into CATEGORIES per row; None -> Clothing, unknown or Books -> -1"""
+    lookup = {name: i for i, name in enumerate(CATEGORIES)}
+    return np.fromiter((lookup.get(DEFAULT_CATEGORY if v is None else v, -1) for v in values),
+                       dtype=np.int64, count=len(values))
+
+
+def sales_summary(monthly):
+    """Total, mean, std and last-3 over first-3 trend of (n, 12) monthly sales, as in training"""
+    first_3 = monthly[:, :3].mean(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sales_trend = np.where(first_3 > 0, monthly[:, -3:].mean(axis=1) / first_3, 1.0)
+    # pandas' std in stages.sales_features is the sample std
+    return monthly.sum(axis=1), monthly.mean(axis=1), monthly.std(axis=1, ddof=1), sales_trend
+
+
+def business_feature_matrix(product_id, price, review_score, review_count, category_code, monthly, scaling):
+    """The BUSINESS_COLUMNS of n rows, computed the way the pipeline stages do for training
+
+    ``scaling`` holds the training statistics (``load_feature_scaling``).
+    """
+    product_id = np.where(np.isnan(product_id), DEFAULTS["product_id"], product_id)
+    price = np.where(np.isnan(price), DEFAULTS["price"], price)
+    review_score = np.where(np.isnan(review_score), DEFAULTS["review_score"], review_score)
+    review_count = np.where(np.isnan(review_count), DEFAULTS["review_count"], review_count)
+    total_sales, avg_sales, sales_variability, sales_trend = sales_summary(monthly)
+
+    standardized = ((np.column_stack((price, review_score, review_count, total_sales, avg_sales))
+                     - scaling["mean"]) / scaling["std"])
+    # Row len(CATEGORIES) of the identity is all zeros once truncated: unknown/Books
+    one_hot = np.eye(len(CATEGORIES) + 1)[np.where(category_code >= 0, category_code, len(CATEGORIES))][:, :len(CATEGORIES)]
+    # Tercile edges of the training prices; Low is the reference level
+    low, high = scaling["price_terciles"]
+    return np.column_stack((
+        product_id,
+        standardized[:, :3],
+        monthly,
+        standardized[:, 3:],
+        one_hot,
+        sales_variability,
+        sales_trend,
+        ((price > low) & (price <= high)).astype(np.float64),
+        (price > high).astype(np.float64),
+    ))
+
+
+def raw_feature_values(business, scaling):
+    """Unstandardized price, reviews and sales features of business rows (drift.FEATURES order)"""
+    standardized = business[:, [BUSINESS_COLUMNS.index(c) for c in STANDARDIZED]]
+    other = business[:, [BUSINESS_COLUMNS.index(c) for c in ("sales_variability", "sales_trend")]]
+    return np.column_stack((standardized * scaling["std"] + scaling["mean"], other))
+
+
+def make_feature_scaling(mean, std, price_terciles, feature_names):
+    """Training statistics serving needs, for the model trained on ``feature_names``
+
+    ``mean``/``std`` are the scaler's (over STANDARDIZED), ``price_terciles``
+    the Low/Medium and Medium/High price edges.
+    """
+    return {
+        "standardized": list(STANDARDIZED),
+        "mean": [float(v) for v in mean],
+        "std": [float(v) for v in std],
+        "price_terciles": [float(v) for v in price_terciles],
+        "feature_names": [name for name in feature_names if not name.startswith(EMBEDDING_PREFIX)],
+    }
+
+
+def save_feature_scaling(scaling, model_dir):
+    path = os.path.join(model_dir, SCALING_FILENAME)
+    with open(path, "w") as f:
+        json.dump(scaling, f, indent=4)
+    return path
+
+
+def load_feature_scaling(model_dir):
+    """Load the training statistics saved next to the models; serving can't build inputs without them"""
+    path = os.path.join(model_dir, SCALING_FILENAME)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{path} is missing; re-run the train stage or model_training_optimized.ipynb "
+                                "to save the scaler and price terciles with the models")
+    with open(path) as f:
+        scaling = json.load(f)
+    if scaling.get("standardized") != STANDARDIZED:
+        raise ValueError(f"{path} standardizes {scaling.get('standardized')}, serving expects {STANDARDIZED}")
+    std = np.asarray(scaling["std"], dtype=np.float64)
+    low, high = scaling["price_terciles"]
+    if len(scaling["mean"]) != len(STANDARDIZED) or std.shape != (len(STANDARDIZED),) or not (std > 0).all():
+        raise ValueError(f"{path} needs a mean and a positive std per standardized column")
+    if not low <= high:
+        raise ValueError(f"{path} price terciles are out of order: {low}, {high}")
+    return scaling
+
+
+def check_feature_scaling(scaling, layout):
+    """Raise ValueError unless the statistics were saved for the model with this layout"""
+    if layout.feature_names:
+        expected = [name for name in layout.feature_names if not name.startswith(EMBEDDING_PREFIX)]
+        if scaling["feature_names"] != expected:
+            raise ValueError(f"{SCALING_FILENAME} was saved for a model with inputs {scaling['feature_names']}, "
+                             f"the loaded model takes {expected}; save them from the same training run")
+    elif len(scaling["feature_names"]) != layout.n_features - len(layout.embedding_positions):
+        raise ValueError(f"{SCALING_FILENAME} was saved for {len(scaling['feature_names'])} business inputs, "
+                         f"the loaded model takes {layout.n_features - len(layout.embedding_positions)}")
+
+
+class ModelLayout:
+    """Where each feature goes in the model input, from the names the models were trained with
+
+    Models trained without feature names (NumPy input) are assumed to follow the
+    training frame order: BUSINESS_COLUMNS first, the embedding in the last
+    ``embedding_dim`` columns.
+    """
+
+    def __init__(self, feature_names, n_features, embedding_dim):
+        self.feature_names = feature_names
+        self.n_features = n_features
+        if feature_names:
+            positions = {name: i for i, name in enumerate(feature_names)}
+            self.embedding_positions = np.array(
+                [i for i, name in enumerate(feature_names) if name.startswith(EMBEDDING_PREFIX)], dtype=np.int64)
+        else:
+            first_embedding = n_features - embedding_dim
+            positions = {name: i for i, name in enumerate(BUSINESS_COLUMNS) if i < first_embedding}
+            self.embedding_positions = np.arange(max(first_embedding, 0), n_features)
+        if len(self.embedding_positions) != embedding_dim:
+            raise ValueError(f"Models take {len(self.embedding_positions)} embedding columns, "
+                             f"the embedding stage gives {embedding_dim}")
+        self.business_positions = np.array([positions.get(name, -1) for name in BUSINESS_COLUMNS], dtype=np.int64)
+        self._business_used = self.business_positions >= 0
+        known = set(self.business_positions[self._business_used].tolist()) | set(self.embedding_positions.tolist())
+        # Model inputs the API can't compute; left at zero
+        self.unknown = [feature_names[i] if feature_names else i for i in range(n_features) if i not in known]
+
+    @classmethod
+    def from_model(cls, model, embedding_dim):
+        if hasattr(model, "get_booster"):
+            feature_names = model.get_booster().feature_names
+        else:
+            feature_names = getattr(model, "feature_names_in_", None)
+        return cls(list(feature_names) if feature_names is not None else None, model.n_features_in_, embedding_dim)
+
+    def build(self, business, emb):
+        """Model input for (n, len(BUSINESS_COLUMNS)) business rows and (n, embedding_dim) embeddings"""
+        combined = np.zeros((len(business), self.n_features))
+        combined[:, self.business_positions[self._business_used]] = business[:, self._business_used]
+        combined[:, self.embedding_positions] = emb
+        return combined
+
+
+def names_at(names, rows):
+    """Product names at the given row indices as a list of str (tokenizer input)"""
+    taken = names.take(rows)
+    return taken.to_pylist() if hasattr(taken, "to_pylist") else taken.tolist()
+
+
+class ProductCatalog:
+    """Business features per catalog product name, precomputed once, looked up by name
+
+    A name shared by several catalog rows resolves to the first of them, the
+    way a single training row describes one product. ``scaling`` is kept for
+    raw feature rows scored alongside the catalog.
+    """
+
+    def __init__(self, df, scaling):
+        self.scaling = scaling
+        codes, names = pd.factorize(df["product_name"].astype(str).str.lower())
+        first = np.unique(codes, return_index=True)[1]
+        rows = df.iloc[first]
+
+        sales_cols = sorted((col for col in df.columns if col.startswith(SALES_PREFIX)),
+                            key=lambda col: int(col[len(SALES_PREFIX):]))
+        if sales_cols:
+            monthly = rows[sales_cols].to_numpy(dtype=np.float64)
+        else:
+            monthly = np.full((len(rows), NUM_MONTHS), DEFAULTS["monthly_sales"])
+
+        category = [None if pd.isna(c) else c for c in rows["category"].to_numpy(dtype=object)]
+        self.category = [DEFAULT_CATEGORY if c is None else c for c in category]
+        self.features = business_feature_matrix(
+            rows["product_id"].to_numpy(dtype=np.float64),
+            rows["price"].to_numpy(dtype=np.float64),
+            rows["review_score"].to_numpy(dtype=np.float64),
+            rows["review_count"].to_numpy(dtype=np.float64),
+            category_codes(category),
+            monthly,
+            scaling,
+        )
+        self._names = list(names)
+        self._index = {name: i for i, name in enumerate(self._names)}
+        self._arrow_names = None
+
+    def rows(self, names):
+        """Feature row per name (-1 when not found); names is a list or an Arrow array"""
+        if hasattr(names, "to_pylist"):
+            import pyarrow as pa
+            import pyarrow.compute as pc
+            if self._arrow_names is None:
+                self._arrow_names = pa.array(self._names, type=pa.string())
+            found = pc.index_in(pc.utf8_lower(names.cast(pa.string())), value_set=self._arrow_names)
+            return found.fill_null(-1).to_numpy().astype(np.int64)
+        return np.fromiter((self._index.get(name.lower(), -1) if name is not None else -1 for name in names),
+                           dtype=np.int64, count=len(names))
+
+
+# ------------------- decoding -------------------
+def read_arrow_columns(body):
+    """Decode an Arrow IPC stream (or file) into the batch column dict"""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    try:
+        if body[:6] == b"ARROW1":
+            table = pa.ipc.open_file(pa.py_buffer(body)).read_all()
+        else:
+            table = pa.ipc.open_stream(pa.py_buffer(body)).read_all()
+    except pa.ArrowInvalid as e:
+        raise ValueError(f"Invalid Arrow IPC body: {e}") from None
+    table = table.combine_chunks()
+    names = table.column_names
+
+    def floats(name):
+        if name not in names:
+            return np.full(table.num_rows, np.nan)
+        return table.column(name).cast(pa.float64()).to_numpy()
+
+    columns = {"n_rows": table.num_rows, "product_name": None, "emb": None}
+    if "product_name" in names:
+        columns["product_name"] = table.column("product_name").chunk(0) if table.num_rows else pa.array([], pa.string())
+
+    # A row is a raw feature row when any of its raw columns holds a value
+    columns["raw"] = np.zeros(table.num_rows, dtype=bool)
+    for name in names:
+        if name in RAW_FIELDS or name.startswith(SALES_PREFIX):
+            columns["raw"] |= table.column(name).is_valid().to_numpy(zero_copy_only=False)
+    if columns["raw"].any():
+        columns["product_id"] = floats("product_id")
+        columns["price"] = floats("price")
+        columns["review_score"] = floats("review_score")
+        columns["review_count"] = floats("review_count")
+        if "category" in names:
+            category = table.column("category").cast(pa.string())
+            codes = pc.index_in(category, value_set=pa.array(CATEGORIES)).fill_null(-1).to_numpy().astype(np.int64)
+            columns["category_code"] = np.where(pc.is_null(category).to_numpy(zero_copy_only=False), 0, codes)
+        else:
+            columns["category_code"] = np.zeros(table.num_rows, dtype=np.int64)
+        columns["monthly"] = _arrow_monthly(table, pa)
+
+    emb_cols = sorted((n for n in names if n.startswith(EMBEDDING_PREFIX)), key=lambda n: int(n[len(EMBEDDING_PREFIX):]))
+    if emb_cols:
+        columns["emb"] = np.column_stack([table.column(n).cast(pa.float32()).to_numpy() for n in emb_cols])
+    return columns
+
+
+def _arrow_monthly(table, pa):
+    names = table.column_names
+    if "monthly_sales" in names:
+        col = table.column("monthly_sales").cast(pa.list_(pa.float64()))
+        col = col.chunk(0) if table.num_rows else pa.array([], pa.list_(pa.float64()))
+        valid = col.is_valid().to_numpy(zero_copy_only=False)
+        if not (col.value_lengths().fill_null(0).to_numpy()[valid] == NUM_MONTHS).all():
+            raise ValueError(f"monthly_sales must hold {NUM_MONTHS} values per row")
+        monthly = np.full((table.num_rows, NUM_MONTHS), np.nan)
+        # flatten() skips null lists, leaving the values of the valid rows
+        monthly[valid] = col.flatten().to_numpy(zero_copy_only=False).reshape(-1, NUM_MONTHS)
+        return monthly
+    sales_cols = [f"{SALES_PREFIX}{m + 1}" for m in range(NUM_MONTHS)]
+    if all(c in names for c in sales_cols):
+        return np.column_stack([table.column(c).cast(pa.float64()).to_numpy() for c in sales_cols])
+    if any(c in names for c in sales_cols):
+        raise ValueError(f"Expected all of {sales_cols[0]}..{sales_cols[-1]}")
+    return np.full((table.num_rows, NUM_MONTHS), np.nan)
+
+
+def json_columns(body):
+    """Validate a JSON batch and turn it into the batch column dict"""
+    products = BatchInput.model_validate_json(body).products
+    n = len(products)
+    columns = {"n_rows": n, "emb": None}
+    names = [p.product_name for p in products]
+    columns["product_name"] = np.array(names, dtype=object) if any(name is not None for name in names) else None
+
+    columns["raw"] = np.array([any(getattr(p, field) is not None for field in RAW_FIELDS) for p in products],
+                              dtype=bool)
+    if columns["raw"].any():
+        for field in ("product_id", "price", "review_score", "review_count"):
+            columns[field] = np.array([np.nan if getattr(p, field) is None else getattr(p, field) for p in products],
+                                      dtype=np.float64)
+        columns["category_code"] = category_codes([p.category for p in products])
+        monthly = np.full((n, NUM_MONTHS), np.nan)
+        for i, p in enumerate(products):
+            if p.monthly_sales is not None:
+                if len(p.monthly_sales) != NUM_MONTHS:
+                    raise ValueError(f"monthly_sales must hold {NUM_MONTHS} values per row")
+                monthly[i] = [np.nan if v is None else v for v in p.monthly_sales]
+        columns["monthly"] = monthly
+
+    if any(p.embedding is not None for p in products):
+        if any(p.embedding is None for p in products):
+            raise ValueError("embedding must be given for every row or none")
+        columns["emb"] = np.array([p.embedding for p in products], dtype=np.float32)
+    return columns
+
+
+def missing_names(names, n):
+    """True for rows without a product_name"""
+    if names is None:
+        return np.ones(n, dtype=bool)
+    if hasattr(names, "is_null"):
+        return names.is_null().to_numpy(zero_copy_only=False)
+    return np.array([name is None for name in names], dtype=bool)
+
+
+def check_raw_values(columns):
+    """ValueError naming the first raw row and column that is missing, null or not finite
+
+    Missing values are missing the same way in JSON and Arrow (NaN once decoded),
+    so both reject them alike; only ``product_id`` and ``category`` may be left out.
+    """
+    raw = columns["raw"]
+    checks = [(field, columns[field]) for field in ("price", "review_score", "review_count")]
+    checks += [(f"{SALES_PREFIX}{m + 1}", columns["monthly"][:, m]) for m in range(NUM_MONTHS)]
+    for name, values in checks:
+        bad = raw & ~np.isfinite(values)
+        if bad.any():
+            raise ValueError(f"Row {int(np.argmax(bad))}: {name} is missing or not a finite number")
+    bad = raw & np.isinf(columns["product_id"])
+    if bad.any():
+        raise ValueError(f"Row {int(np.argmax(bad))}: product_id is not a finite number")
+
+
+def batch_features(columns, catalog):
+    """Business features of the scorable rows of a decoded batch, and which rows those are
+
+    Each row is resolved on its own: raw feature rows are always scored, from
+    their own values; name-only rows are scored from the catalog when it knows
+    the product. Rows with neither, raw rows with neither a name nor an
+    embedding to score them with, and raw or embedding values that are
+    missing or not finite are a ValueError.
+    """
+    n = columns["n_rows"]
+    if not n:
+        return np.zeros((0, len(BUSINESS_COLUMNS))), np.ones(0, dtype=bool)
+    raw = columns["raw"]
+    unnamed = missing_names(columns["product_name"], n)
+    if (unnamed & ~raw).any():
+        raise ValueError(f"Row {int(np.argmax(unnamed & ~raw))} needs product_name or raw feature columns")
+    if columns["emb"] is None and (unnamed & raw).any():
+        raise ValueError(f"Row {int(np.argmax(unnamed & raw))} has no embedding, so it needs product_name")
+    if raw.any():
+        check_raw_values(columns)
+    if columns["emb"] is not None:
+        bad = ~np.isfinite(columns["emb"]).all(axis=1)
+        if bad.any():
+            raise ValueError(f"Row {int(np.argmax(bad))}: embedding is not all finite numbers")
+
+    business = np.empty((n, len(BUSINESS_COLUMNS)))
+    found = raw.copy()
+    if raw.any():
+        business[raw] = business_feature_matrix(*(columns[field][raw] for field in (
+            "product_id", "price", "review_score", "review_count", "category_code", "monthly")), catalog.scaling)
+    if not raw.all():
+        named = np.flatnonzero(~raw)
+        names = columns["product_name"]
+        rows = catalog.rows(names.take(named) if raw.any() else names)
+        business[named[rows >= 0]] = catalog.features[rows[rows >= 0]]
+        found[named] = rows >= 0
+    return business[found], found
+
+
+# ------------------- encoding -------------------
+def write_arrow_results(proba, stage, found):
+    """Columnar Arrow IPC stream: success_probability, prediction, stage, found (input row order)"""
+    import pyarrow as pa
+
+    missing = ~found
+    table = pa.table({
+        "success_probability": pa.array(proba, type=pa.float64(), mask=missing),
+        "prediction": pa.array((proba >= 0.5).astype(np.int8), type=pa.int8(), mask=missing),
+        "stage": pa.DictionaryArray.from_arrays(
+            pa.array(stage, type=pa.int8(), mask=missing), pa.array(STAGES)
+        ),
+        "found": pa.array(found, type=pa.bool_()),
+    })
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def json_results(names, proba, stage, found):
+    """Per-row result objects shaped like the /predict response"""
+    names = [None] * len(found) if names is None else names_at(names, np.arange(len(found)))
+    results = []
+    for name, p, s, ok in zip(names, proba.tolist(), stage.tolist(), found.tolist()):
+        if not ok:
+            results.append({"product_name": name, "error": "Product not found"})
+            continue
+        results.append({
+            "product_name": name,
+            "success_probability": round(p, 4),
+            "prediction": "Success" if p >= 0.5 else "Fail",
+            "stage": STAGES[s],
+        })
+    return json.dumps({"results": results}).encode()
@@ -0,0 +1,215 @@
+"""
+Confidence-based early-exit cascade for the stacked ensemble.
+
+XGBoost runs first. When its probability falls outside the calibrated
+``[low, high]`` band its label is returned directly and the MLP and meta-model
+(and the DistilBERT embedding, when XGBoost never splits on it) are skipped.
+The band is calibrated offline so that label disagreement with the full
+ensemble stays under a configured budget, on one part of the held-out
+predictions, and the disagreement it actually causes is reported on the rest.
+"""
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+BANDS_FILENAME = "cascade_bands.json"
+
+
+def calibrate_cascade_bands(xgb_proba, ensemble_proba, max_disagreement=0.01, threshold=0.5):
+    """Find the widest early-exit region whose disagreement with the ensemble fits the budget
+
+    Returns a dict with ``low``/``high``: predictions with ``xgb <= low`` or
+    ``xgb >= high`` exit early. At most ``max_disagreement`` (fraction of all
+    calibration rows) may get a different label than the full ensemble.
+    """
+    xgb_proba = np.asarray(xgb_proba, dtype=np.float64)
+    ensemble_proba = np.asarray(ensemble_proba, dtype=np.float64)
+    n = len(xgb_proba)
+    budget = int(np.floor(max_disagreement * n))
+    disagree = (xgb_proba >= threshold) != (ensemble_proba >= threshold)
+
+    # Low side: exiting the i smallest probabilities (all below threshold)
+    order = np.argsort(xgb_proba, kind="stable")
+    low_p, low_d = xgb_proba[order], disagree[order]
+    n_low = int(np.searchsorted(low_p, threshold, side="left"))
+    low_cost = np.concatenate([[0], np.cumsum(low_d[:n_low])])
+
+    # High side: exiting the j largest probabilities (all at/above threshold)
+    high_p, high_d = low_p[::-1], low_d[::-1]
+    n_high = n - n_low
+    high_cost = np.concatenate([[0], np.cumsum(high_d[:n_high])])
+
+    best = (0, 0, 0)
+    for i in range(n_low + 1):
+        remaining = budget - low_cost[i]
+        if remaining < 0:
+            break
+        # Largest j with high_cost[j] <= remaining (high_cost is non-decreasing)
+        j = int(np.searchsorted(high_cost, remaining, side="right")) - 1
+        # Ties in probability cannot be split by a threshold, back off to a boundary
+        while i > 0 and i < n_low and low_p[i] == low_p[i - 1]:
+            i -= 1
+        while 0 < j < n_high and high_p[j] == high_p[j - 1]:
+            j -= 1
+        if i + j > best[0]:
+            best = (i + j, i, j)
+
+    _, i, j = best
+    low = float(low_p[i - 1]) if i > 0 else -1.0
+    high = float(high_p[j - 1]) if j > 0 else 2.0
+    exited = (xgb_proba <= low) | (xgb_proba >= high)
+    return {
+        "low": low,
+        "high": high,
+        "threshold": threshold,
+        "max_disagreement": max_disagreement,
+        "calibration": {
+            "n": n,
+            "short_circuit_rate": float(exited.mean()) if n else 0.0,
+            "disagreement_rate": float((disagree & exited).mean()) if n else 0.0,
+        },
+    }
+
+
+def evaluate_cascade_bands(bands, xgb_proba, ensemble_proba):
+    """Short-circuit and label disagreement rates of bands on predictions they weren't calibrated on"""
+    xgb_proba = np.asarray(xgb_proba, dtype=np.float64)
+    ensemble_proba = np.asarray(ensemble_proba, dtype=np.float64)
+    n = len(xgb_proba)
+    exited = (xgb_proba <= bands["low"]) | (xgb_proba >= bands["high"])
+    disagree = (xgb_proba >= bands["threshold"]) != (ensemble_proba >= bands["threshold"])
+    return {
+        "n": n,
+        "short_circuit_rate": float(exited.mean()) if n else 0.0,
+        "disagreement_rate": float((disagree & exited).mean()) if n else 0.0,
+    }
+
+
+def calibrate_on_holdout(xgb_proba, ensemble_proba, max_disagreement=0.01, calibration_fraction=0.5,
+                         random_state=42):
+    """Calibrate bands on a random part of held-out predictions and evaluate them on the rest
+
+    The returned bands carry the in-sample ``calibration`` stats and the
+    out-of-sample ``evaluation`` stats.
+    """
+    xgb_proba = np.asarray(xgb_proba, dtype=np.float64)
+    ensemble_proba = np.asarray(ensemble_proba, dtype=np.float64)
+    calibration = np.random.default_rng(random_state).random(len(xgb_proba)) < calibration_fraction
+    bands = calibrate_cascade_bands(xgb_proba[calibration], ensemble_proba[calibration],
+                                    max_disagreement=max_disagreement)
+    bands["evaluation"] = evaluate_cascade_bands(bands, xgb_proba[~calibration], ensemble_proba[~calibration])
+    return bands
+
+
+def save_cascade_bands(bands, model_dir):
+    path = os.path.join(model_dir, BANDS_FILENAME)
+    with open(path, "w") as f:
+        json.dump(bands, f, indent=4)
+    return path
+
+
+def load_cascade_bands(model_dir):
+    """Load calibrated bands, or None when the cascade hasn't been calibrated"""
+    path = os.path.join(model_dir, BANDS_FILENAME)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def should_exit_early(bands, xgb_proba):
+    return xgb_proba <= bands["low"] or xgb_proba >= bands["high"]
+
+
+def served_proba(bands, xgb_proba, ensemble_proba):
+    """The probability the API returns per row: XGBoost's on early exits, the ensemble's otherwise"""
+    xgb_proba = np.asarray(xgb_proba, dtype=np.float64)
+    early_exit = (xgb_proba <= bands["low"]) | (xgb_proba >= bands["high"])
+    return np.where(early_exit, xgb_proba, ensemble_proba)
+
+
+def xgb_used_features(xgb_model):
+    """Indices of the input columns XGBoost actually splits on, in the model's column order"""
+    booster = xgb_model.get_booster()
+    names = booster.feature_names
+    used = booster.get_score(importance_type="weight").keys()
+    if names:
+        positions = {name: i for i, name in enumerate(names)}
+        return {positions[f] for f in used}
+    return {int(f[1:]) for f in used}
+
+
+class CascadeStats:
+    """Thread-safe short-circuit counters and an estimate of the latency saved
+
+    The saving is every early exit times the moving average cost of the stages
+    it skipped. Seed that average (``seed``) with a measured cost so exits are
+    credited before the first full run, which may never come when nearly
+    everything exits.
+    """
+
+    def __init__(self, smoothing=0.05):
+        self._lock = threading.Lock()
+        self._smoothing = smoothing
+        self.total = 0
+        self.short_circuited = 0
+        self.skipped_stage_ms = None  # moving average cost of the stages an early exit skips
+
+    def seed(self, skipped_stage_ms):
+        with self._lock:
+            if self.skipped_stage_ms is None:
+                self.skipped_stage_ms = skipped_stage_ms
+
+    def record_full(self, expensive_stage_seconds):
+        ms = expensive_stage_seconds * 1000
+        with self._lock:
+            self.total += 1
+            if self.skipped_stage_ms is None:
+                self.skipped_stage_ms = ms
+            else:
+                self.skipped_stage_ms += self._smoothing * (ms - self.skipped_stage_ms)
+
+    def record_exit(self):
+        with self._lock:
+            self.total += 1
+            self.short_circuited += 1
+
+    def record_batch(self, n_exit, n_full, expensive_stage_seconds):
+        """Record a scored batch; the expensive stages ran once for all n_full rows"""
+        with self._lock:
+            self.total += n_exit + n_full
+            self.short_circuited += n_exit
+            if n_full:
+                ms = expensive_stage_seconds * 1000 / n_full
+                if self.skipped_stage_ms is None:
+                    self.skipped_stage_ms = ms
+                else:
+                    self.skipped_stage_ms += self._smoothing * (ms - self.skipped_stage_ms)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "total": self.total,
+                "short_circuited": self.short_circuited,
+                "short_circuit_rate": self.short_circuited / self.total if self.total else 0.0,
+                "avg_skipped_stage_ms": self.skipped_stage_ms,
+                "estimated_latency_saved_ms": self.short_circuited * (self.skipped_stage_ms or 0.0),
+            }
+
+
+class StageTimer:
+    """Accumulates wall time of the stages an early exit would have skipped"""
+
+    def __init__(self):
+        self.seconds = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds += time.perf_counter() - self._start
+        return False
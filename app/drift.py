@@ -0,0 +1,305 @@
+"""
+Online feature-drift monitoring against the training distribution.
+
+The pipeline saves a baseline (``models/optimized/drift_baseline.json``): for
+each raw numeric feature the API standardizes, and for the predicted success
+probability, the training percentiles as histogram edges, the share of rows in
+each bin and the mean/std. On the inference path every request adds its values
+to fixed-size histograms over those edges plus running moments, so memory is
+constant however much traffic arrives. Each request thread has its own shard
+and updates it without locking. A background thread periodically merges the
+shards into a tumbling window and scores it against the baseline with PSI
+(over ~10 equal-mass groups of bins) and the two-sample KS statistic (over the
+percentile bins).
+"""
+import bisect
+import json
+import math
+import os
+import threading
+import time
+
+import numpy as np
+
+BASELINE_FILENAME = "drift_baseline.json"
+# Raw inputs of the model as computed in /predict, then the model output
+FEATURES = ["price", "review_score", "review_count", "total_sales", "avg_sales_per_month",
+            "sales_variability", "sales_trend", "success_probability"]
+PSI_ALERT = 0.2
+_EPS = 1e-4
+
+
+def _bin_counts(values, edges):
+    """Counts over [-inf, e0), [e0, e1), ..., [e_last, inf)"""
+    return np.bincount(np.searchsorted(edges, values, side="right"), minlength=len(edges) + 1)
+
+
+def fit_drift_baseline(columns, n_bins=100, psi_groups=10):
+    """Baseline histograms and moments for {feature: 1-D training values}"""
+    baseline = {"features": {}}
+    for name, values in columns.items():
+        values = np.asarray(values, dtype=np.float64)
+        values = values[np.isfinite(values)]
+        edges = np.unique(np.percentile(values, np.linspace(0, 100, n_bins + 1)))
+        proportions = _bin_counts(values, edges) / len(values)
+        # Contiguous runs of bins holding ~1/psi_groups of the mass each
+        cumulative = np.cumsum(proportions)
+        cuts = np.unique(np.searchsorted(cumulative, np.arange(1, psi_groups) / psi_groups, side="left") + 1)
+        cuts = cuts[(cuts > 0) & (cuts < len(proportions))]
+        baseline["features"][name] = {
+            "edges": edges.tolist(),
+            "proportions": proportions.tolist(),
+            "psi_groups": cuts.tolist(),
+            "mean": float(values.mean()),
+            "std": float(values.std()),
+            "count": int(len(values)),
+        }
+    return baseline
+
+
+def save_drift_baseline(baseline, model_dir):
+    path = os.path.join(model_dir, BASELINE_FILENAME)
+    with open(path, "w") as f:
+        json.dump(baseline, f)
+    return path
+
+
+def load_drift_baseline(model_dir):
+    """Load the pipeline's baseline, or None when it hasn't been built"""
+    path = os.path.join(model_dir, BASELINE_FILENAME)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def psi(expected, actual):
+    """Population stability index between two proportion vectors"""
+    expected = np.maximum(expected, _EPS)
+    actual = np.maximum(actual, _EPS)
+    return float(((actual - expected) * np.log(actual / expected)).sum())
+
+
+class _Shard:
+    """One thread's histograms and shifted sums; only its owner thread writes it"""
+
+    def __init__(self, n_bins, n_features):
+        self.owner = threading.current_thread()
+        self.generation = -1
+        self.counts = np.zeros(n_bins, dtype=np.int64)
+        self.sums = np.zeros((3, n_features))  # count, sum and sum of squares of (x - baseline mean)
+        self.non_finite = 0  # rows dropped for a NaN or infinite value
+
+    def reset(self, generation):
+        self.counts[:] = 0
+        self.sums[:] = 0
+        self.non_finite = 0
+        self.generation = generation
+
+
+class DriftMonitor:
+    """Sharded streaming sketches of live feature values, scored against a baseline"""
+
+    def __init__(self, baseline, interval=60.0, min_samples=200):
+        self.features = list(FEATURES)
+        self.baseline = baseline
+        self.interval = interval
+        self.min_samples = min_samples
+
+        specs = [baseline["features"][name] for name in self.features]
+        self._edges = [np.asarray(spec["edges"]) for spec in specs]
+        self._edge_lists = [spec["edges"] for spec in specs]
+        sizes = np.array([len(edges) + 1 for edges in self._edges])
+        self._offsets = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+        self._offset_list = self._offsets.tolist()
+        self._n_bins = int(sizes.sum())
+        self._center = np.array([spec["mean"] for spec in specs])
+
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()  # guards the shard list and window roll-over, never record()
+        self._generation = 0
+        self._window_start = time.time()
+        self._total = _Shard(self._n_bins, len(self.features))
+        self.last_window = None
+        self._thread = None
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    # ------------------- hot path -------------------
+    def record(self, values):
+        """Add one row (n_features,) or a batch (n, n_features) of values in FEATURES order
+
+        Rows with a NaN or infinite value are only counted in ``non_finite``;
+        one of them in the sums would turn every later mean and std into nan.
+        """
+        if self._thread is None:
+            self.start()
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = _Shard(self._n_bins, len(self.features))
+            self._local.shard = shard
+            with self._lock:
+                self._shards.append(shard)
+        if shard.generation != self._generation:
+            shard.reset(self._generation)
+
+        if np.ndim(values) == 1:
+            # bisect on plain lists beats per-feature searchsorted calls for one row
+            row = [float(v) for v in values]
+            if not all(math.isfinite(v) for v in row):
+                shard.non_finite += 1
+                return
+            shard.counts[[offset + bisect.bisect_right(edges, v)
+                          for offset, edges, v in zip(self._offset_list, self._edge_lists, row)]] += 1
+            shifted = np.array(row) - self._center
+            shard.sums[0] += 1.0
+            shard.sums[1] += shifted
+            shard.sums[2] += shifted * shifted
+            return
+
+        values = np.asarray(values, dtype=np.float64)
+        finite = np.isfinite(values).all(axis=1)
+        if not finite.all():
+            shard.non_finite += int((~finite).sum())
+            values = values[finite]
+        bins = np.column_stack([np.searchsorted(edges, values[:, j], side="right")
+                                for j, edges in enumerate(self._edges)]) + self._offsets
+        shard.counts += np.bincount(bins.ravel(), minlength=self._n_bins)
+        shifted = values - self._center
+        shard.sums[0] += len(values)
+        shard.sums[1] += shifted.sum(axis=0)
+        shard.sums[2] += (shifted ** 2).sum(axis=0)
+
+    # ------------------- periodic scoring -------------------
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="drift-monitor", daemon=True)
+                self._thread.start()
+
+    def _after_fork(self):
+        # Forked workers start with no shards and their own scoring thread
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._shards = []
+        self._thread = None
+        self._generation += 1
+        self._window_start = time.time()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.roll_window()
+            except Exception:
+                import traceback
+                traceback.print_exc()
+
+    def _merge(self):
+        """Counts and sums of the current window (shards may be mid-update; fine for monitoring)"""
+        merged = _Shard(self._n_bins, len(self.features))
+        for shard in list(self._shards):
+            if shard.generation == self._generation:
+                merged.counts += shard.counts
+                merged.sums += shard.sums
+                merged.non_finite += shard.non_finite
+        return merged
+
+    def roll_window(self):
+        """Score the current window and start a new one, once it holds min_samples rows"""
+        with self._lock:
+            window = self._merge()
+            if window.sums[0, 0] < self.min_samples:
+                return None
+            start, end = self._window_start, time.time()
+            self._generation += 1
+            self._window_start = end
+            self._total.counts += window.counts
+            self._total.sums += window.sums
+            self._total.non_finite += window.non_finite
+            # Shards of exited threads are fully merged by now
+            self._shards = [shard for shard in self._shards if shard.owner.is_alive()]
+
+        report = self.score(window)
+        report.update({"window_start": start, "window_end": end})
+        self.last_window = report
+        drifted = [name for name, stats in report["features"].items() if stats["drifted"]]
+        if drifted:
+            print(f"Feature drift detected over the last {end - start:.0f}s: {', '.join(drifted)}")
+        return report
+
+    def score(self, window):
+        """PSI, KS and moment shift of every feature in a window vs the baseline"""
+        features = {}
+        for j, name in enumerate(self.features):
+            spec = self.baseline["features"][name]
+            offset = self._offsets[j]
+            counts = window.counts[offset:offset + len(self._edges[j]) + 1]
+            n = int(window.sums[0, j])
+            if not n:
+                features[name] = {"count": 0, "drifted": False}
+                continue
+            live = counts / n
+            expected = np.asarray(spec["proportions"])
+
+            groups = spec["psi_groups"]
+            feature_psi = psi(np.add.reduceat(expected, [0] + groups), np.add.reduceat(live, [0] + groups))
+            ks = float(np.abs(np.cumsum(live) - np.cumsum(expected)).max())
+            # Two-sample KS critical value at alpha = 0.05
+            m = spec["count"]
+            ks_critical = 1.358 * np.sqrt((n + m) / (n * m))
+
+            mean_shift = window.sums[1, j] / n
+            variance = max(window.sums[2, j] / n - mean_shift ** 2, 0.0)
+            features[name] = {
+                "count": n,
+                "psi": round(feature_psi, 4),
+                "ks": round(ks, 4),
+                "ks_critical": round(float(ks_critical), 4),
+                "mean": spec["mean"] + mean_shift,
+                "std": float(np.sqrt(variance)),
+                "baseline_mean": spec["mean"],
+                "baseline_std": spec["std"],
+                "mean_shift_std": mean_shift / spec["std"] if spec["std"] else 0.0,
+                "out_of_range": float(live[0] + live[-1]),
+                "drifted": bool(feature_psi >= PSI_ALERT or ks > ks_critical),
+            }
+        return {"features": features, "non_finite": window.non_finite}
+
+    def snapshot(self):
+        current = self._merge()
+        with self._lock:
+            total = _Shard(self._n_bins, len(self.features))
+            total.counts += self._total.counts + current.counts
+            total.sums += self._total.sums + current.sums
+            total.non_finite = self._total.non_finite + current.non_finite
+        return {
+            "interval_s": self.interval,
+            "current_window_count": int(current.sums[0, 0]),
+            "non_finite_since_start": total.non_finite,
+            "last_window": self.last_window,
+            "since_start": self.score(total) if total.sums[0, 0] >= self.min_samples else None,
+        }
+
+    def prometheus(self):
+        """Last window's scores in the Prometheus text exposition format"""
+        lines = []
+        report = self.last_window
+        for metric, key, help_text in [
+            ("feature_drift_psi", "psi", "Population stability index vs the training baseline"),
+            ("feature_drift_ks", "ks", "Two-sample KS statistic vs the training baseline"),
+            ("feature_drift_mean_shift_std", "mean_shift_std", "Live mean minus training mean, in training stds"),
+            ("feature_drift_detected", "drifted", "1 when PSI or KS crosses its alert threshold"),
+            ("feature_drift_window_count", "count", "Rows in the last scored window"),
+        ]:
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} gauge")
+            for name, stats in (report["features"].items() if report else []):
+                if key in stats:
+                    lines.append(f'{metric}{{feature="{name}"}} {float(stats[key])}')
+        lines.append("# HELP feature_drift_non_finite_rows Rows of the last window dropped for a NaN or infinite value")
+        lines.append("# TYPE feature_drift_non_finite_rows gauge")
+        if report:
+            lines.append(f"feature_drift_non_finite_rows {report['non_finite']}")
+        return "\n".join(lines) + "\n"
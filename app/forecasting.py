@@ -0,0 +1,203 @@
+"""
+Vectorized batch sales forecasting over monthly sales.
+
+The ``sales_month_*`` columns are treated as one (n_products, n_months) array and
+every method is fitted for all products at once with NumPy: loops run over the
+12 months (or a small smoothing-parameter grid), never over products.
+
+Usage (bulk job):
+    uv run python -m app.forecasting --input data/raw/ecommerce_sales.csv \\
+        --output data/processed/sales_forecast.csv --horizon 3 --method ses --backtest
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+SALES_PREFIX = "sales_month_"
+SEASON = 12
+ALPHA_GRID = np.array([0.1, 0.2, 0.3, 0.5, 0.7, 0.9])
+BETA_GRID = np.array([0.05, 0.1, 0.3])
+
+
+def naive_forecast(Y, horizon):
+    """Repeat the last observed month"""
+    return np.repeat(Y[:, -1:], horizon, axis=1)
+
+
+def seasonal_naive_forecast(Y, horizon, season=SEASON):
+    """Repeat the value from one season earlier; needs a full season of history"""
+    if Y.shape[1] < season:
+        raise ValueError(f"seasonal_naive needs {season} months of history, got {Y.shape[1]}")
+    last_cycle = Y[:, -season:]
+    return last_cycle[:, np.arange(horizon) % season]
+
+
+def linear_trend_forecast(Y, horizon):
+    """Per-product least-squares line, extrapolated"""
+    n_months = Y.shape[1]
+    t = np.arange(n_months, dtype=np.float64)
+    t_centered = t - t.mean()
+    slope = (Y - Y.mean(axis=1, keepdims=True)) @ t_centered / (t_centered @ t_centered)
+    future = np.arange(n_months, n_months + horizon) - t.mean()
+    return Y.mean(axis=1, keepdims=True) + slope[:, None] * future[None, :]
+
+
+def _ses_levels(Y, alphas):
+    """Run simple exponential smoothing for every (product, alpha)
+
+    Returns the final levels (n, n_alpha) and the one-step-ahead SSE (n, n_alpha).
+    """
+    level = np.repeat(Y[:, :1], len(alphas), axis=1)
+    sse = np.zeros_like(level)
+    for t in range(1, Y.shape[1]):
+        error = Y[:, t:t + 1] - level
+        sse += error ** 2
+        level = level + alphas[None, :] * error
+    return level, sse
+
+
+def ses_forecast(Y, horizon, alphas=ALPHA_GRID):
+    """Simple exponential smoothing, alpha picked per product by one-step SSE"""
+    level, sse = _ses_levels(Y, alphas)
+    best = sse.argmin(axis=1)
+    return np.repeat(level[np.arange(len(Y)), best][:, None], horizon, axis=1)
+
+
+def holt_forecast(Y, horizon, alphas=ALPHA_GRID, betas=BETA_GRID):
+    """Holt's linear (double exponential) smoothing, (alpha, beta) picked per product"""
+    if Y.shape[1] < 2:
+        return naive_forecast(Y, horizon)
+    a = np.repeat(alphas, len(betas))[None, :]
+    b = np.tile(betas, len(alphas))[None, :]
+    level = np.repeat(Y[:, 1:2], a.shape[1], axis=1)
+    trend = np.repeat(Y[:, 1:2] - Y[:, :1], a.shape[1], axis=1)
+    sse = np.zeros_like(level)
+    for t in range(2, Y.shape[1]):
+        error = Y[:, t:t + 1] - (level + trend)
+        sse += error ** 2
+        new_level = level + trend + a * error
+        trend = trend + a * b * error
+        level = new_level
+    best = sse.argmin(axis=1)
+    rows = np.arange(len(Y))
+    steps = np.arange(1, horizon + 1)
+    return level[rows, best][:, None] + trend[rows, best][:, None] * steps[None, :]
+
+
+FORECAST_METHODS = {
+    "naive": naive_forecast,
+    "seasonal_naive": seasonal_naive_forecast,
+    "linear_trend": linear_trend_forecast,
+    "ses": ses_forecast,
+    "holt": holt_forecast,
+}
+# Months of history a method needs; the others work from one month
+MIN_HISTORY = {"seasonal_naive": SEASON}
+
+
+def forecast(Y, horizon=3, method="ses", block_rows=100_000):
+    """Forecast the next ``horizon`` months for every row of Y (n_products, n_months)
+
+    Rows are processed in blocks so the smoothing grids stay cache-sized.
+    """
+    if method not in FORECAST_METHODS:
+        raise ValueError(f"Unknown method '{method}'. Available: {sorted(FORECAST_METHODS)}")
+    if horizon < 1:
+        raise ValueError("horizon must be at least 1")
+    Y = np.asarray(Y, dtype=np.float64)
+    fn = FORECAST_METHODS[method]
+    out = np.empty((len(Y), horizon))
+    for start in range(0, len(Y), block_rows):
+        out[start:start + block_rows] = fn(Y[start:start + block_rows], horizon)
+    # Unit sales can't go negative
+    return np.maximum(out, 0.0)
+
+
+def backtest(Y, holdout=3, methods=None):
+    """Fit on all but the last ``holdout`` months and score each method on them
+
+    Methods that need more history than remains are reported as unavailable
+    (``note``) instead of being scored.
+    """
+    Y = np.asarray(Y, dtype=np.float64)
+    if not 0 < holdout < Y.shape[1] - 1:
+        raise ValueError(f"holdout must leave at least 2 months of history, got {holdout}")
+    history, actual = Y[:, :-holdout], Y[:, -holdout:]
+    # MASE scale: in-sample mean absolute one-step naive error
+    scale = np.abs(np.diff(history, axis=1)).mean(axis=1)
+    scale = np.where(scale > 0, scale, np.nan)
+
+    results = {}
+    for method in methods or FORECAST_METHODS:
+        needed = MIN_HISTORY.get(method, 1)
+        if history.shape[1] < needed:
+            note = f"unavailable: needs {needed} months of history, backtest leaves {history.shape[1]}"
+            results[method] = {"note": note}
+            continue
+        start = time.perf_counter()
+        predicted = forecast(history, holdout, method)
+        seconds = time.perf_counter() - start
+        error = predicted - actual
+        denom = np.abs(predicted) + np.abs(actual)
+        smape = np.divide(2 * np.abs(error), denom, out=np.zeros_like(error), where=denom > 0)
+        results[method] = {
+            "mae": float(np.abs(error).mean()),
+            "rmse": float(np.sqrt((error ** 2).mean())),
+            "smape": float(smape.mean() * 100),
+            "mase": float(np.nanmean(np.abs(error).mean(axis=1) / scale)),
+            "bias": float(error.mean()),
+            "fit_seconds": seconds,
+            "note": "",
+        }
+    return results
+
+
+def monthly_sales_matrix(df):
+    """The sales_month_* columns in month order, as float64 (n_products, n_months)"""
+    cols = sorted((c for c in df.columns if c.startswith(SALES_PREFIX)),
+                  key=lambda c: int(c[len(SALES_PREFIX):]))
+    return df[cols].to_numpy(dtype=np.float64)
+
+
+def run_bulk(input_path, output_path, horizon=3, method="ses", chunk_rows=200_000):
+    """Forecast every product in a CSV, streaming it in chunks"""
+    n_products = 0
+    start = time.perf_counter()
+    for i, chunk in enumerate(pd.read_csv(input_path, chunksize=chunk_rows)):
+        Y = monthly_sales_matrix(chunk)
+        predicted = forecast(Y, horizon, method)
+        n_months = Y.shape[1]
+        out = pd.DataFrame(predicted, columns=[f"forecast_month_{n_months + h + 1}" for h in range(horizon)])
+        out.insert(0, "product_id", chunk["product_id"].to_numpy())
+        out.to_csv(output_path, mode="w" if i == 0 else "a", header=i == 0, index=False)
+        n_products += len(chunk)
+    seconds = time.perf_counter() - start
+    return {"products": n_products, "seconds": seconds, "products_per_s": n_products / seconds if seconds else None}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch sales forecasting over monthly sales")
+    parser.add_argument("--input", default="data/raw/ecommerce_sales.csv")
+    parser.add_argument("--output", default="data/processed/sales_forecast.csv")
+    parser.add_argument("--horizon", type=int, default=3)
+    parser.add_argument("--method", choices=sorted(FORECAST_METHODS), default="ses")
+    parser.add_argument("--chunk-rows", type=int, default=200_000)
+    parser.add_argument("--backtest", action="store_true", help="report holdout error per method")
+    parser.add_argument("--holdout", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    if args.backtest:
+        Y = monthly_sales_matrix(pd.read_csv(args.input))
+        print(f"Backtest on {len(Y)} products, last {args.holdout} months held out:")
+        print(pd.DataFrame.from_dict(backtest(Y, args.holdout), orient="index").round(4).to_string())
+        print()
+
+    summary = run_bulk(args.input, args.output, args.horizon, args.method, args.chunk_rows)
+    print(f"Forecast {summary['products']} products with {args.method} in {summary['seconds']:.2f}s "
+          f"-> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
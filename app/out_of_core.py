@@ -0,0 +1,291 @@
+"""
+Out-of-core training for catalogs whose feature matrix doesn't fit in RAM.
+
+The embeddings CSV is read in chunks and written once to float32 ``.npy``
+shards, each row tagged as test or with a cross-validation fold. From there:
+
+- XGBoost trains from an ``xgb.DataIter`` over the shards with external-memory
+  (disk-cached, quantized) data, so only one shard is resident at a time.
+- The MLP is trained with ``partial_fit`` epochs over shuffled shards.
+- The meta-model is fit on out-of-fold stacked predictions: for each fold the
+  base models are trained on the other folds and predict the held-out one.
+
+Peak memory is bounded by the shard size, derived from ``max_memory_mb``.
+"""
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from app.reduction import EMBEDDING_PREFIX, project_embeddings
+
+TEST_SPLIT = -1
+# A chunk is parsed as float64 by pandas, copied to float32, then copied again
+# when rows are selected and shuffled; keep a few of those in flight
+_BYTES_PER_VALUE_IN_FLIGHT = 8 * 4
+
+
+def chunk_rows_for_budget(max_memory_mb, n_columns):
+    """Rows per chunk so that a chunk and its working copies fit in max_memory_mb"""
+    return max(256, int(max_memory_mb * 2 ** 20 / (n_columns * _BYTES_PER_VALUE_IN_FLIGHT)))
+
+
+def _assign_splits(rng, n, test_size, n_folds):
+    split = rng.integers(0, n_folds, size=n).astype(np.int8)
+    split[rng.random(n) < test_size] = TEST_SPLIT
+    return split
+
+
+def write_shards(csv_path, shard_dir, chunk_rows, n_folds=3, test_size=0.2, embedding_k=None,
+                 random_state=42, label="success"):
+    """Stream the CSV into float32 shards; returns (shard paths, projection, feature names)
+
+    When embedding_k is set, an incremental PCA is fitted on the training rows in a
+    first pass and the emb_* columns are projected while writing the shards.
+    """
+    columns = pd.read_csv(csv_path, nrows=0).columns
+    feature_cols = [c for c in columns if c != label]
+    emb_cols = [c for c in feature_cols if c.startswith(EMBEDDING_PREFIX)]
+    business_cols = [c for c in feature_cols if c not in emb_cols]
+
+    projection = None
+    if embedding_k:
+        from sklearn.decomposition import IncrementalPCA
+
+        ipca = IncrementalPCA(n_components=embedding_k)
+        rng = np.random.default_rng(random_state)
+        # partial_fit needs at least k rows per batch: short chunks are carried into
+        # the next one, and each batch is held back one step so a short tail can
+        # join the last batch instead of being dropped
+        carry, pending, n_train = None, None, 0
+        for chunk in pd.read_csv(csv_path, usecols=emb_cols + [label], chunksize=chunk_rows):
+            split = _assign_splits(rng, len(chunk), test_size, n_folds)
+            emb = chunk.loc[split != TEST_SPLIT, emb_cols].to_numpy(dtype=np.float32)
+            n_train += len(emb)
+            if carry is not None:
+                emb = np.vstack([carry, emb])
+            if len(emb) < embedding_k:
+                carry = emb
+                continue
+            if pending is not None:
+                ipca.partial_fit(pending)
+            pending, carry = emb, None
+        if carry is not None:
+            pending = carry if pending is None else np.vstack([pending, carry])
+        if pending is None or len(pending) < embedding_k:
+            raise ValueError(f"embedding_k={embedding_k} needs at least {embedding_k} training rows, "
+                             f"the data has {n_train}")
+        ipca.partial_fit(pending)
+        projection = {
+            "method": "pca",
+            "components": ipca.components_.astype(np.float32),
+            "mean": ipca.mean_.astype(np.float32),
+            "explained_variance": float(ipca.explained_variance_ratio_.sum()),
+        }
+        emb_names = [f"{EMBEDDING_PREFIX}pca_{i}" for i in range(embedding_k)]
+    else:
+        emb_names = emb_cols
+
+    os.makedirs(shard_dir, exist_ok=True)
+    rng = np.random.default_rng(random_state)
+    shards = []
+    for i, chunk in enumerate(pd.read_csv(csv_path, chunksize=chunk_rows)):
+        split = _assign_splits(rng, len(chunk), test_size, n_folds)
+        emb = chunk[emb_cols].to_numpy(dtype=np.float32)
+        if projection is not None:
+            emb = project_embeddings(projection, emb)
+        X = np.hstack([chunk[business_cols].to_numpy(dtype=np.float32), emb])
+
+        base = os.path.join(shard_dir, f"shard_{i:05d}")
+        np.save(base + "_X.npy", X)
+        np.save(base + "_y.npy", chunk[label].to_numpy(dtype=np.int8))
+        np.save(base + "_split.npy", split)
+        shards.append(base)
+
+    return shards, projection, business_cols + emb_names
+
+
+def _load(base, select):
+    """Rows of one shard whose split matches select (a predicate on the split array)"""
+    mask = select(np.load(base + "_split.npy"))
+    X = np.load(base + "_X.npy", mmap_mode="r")[mask]
+    y = np.load(base + "_y.npy")[mask]
+    return X, y, mask
+
+
+class ShardIterator(xgb.DataIter):
+    """Feeds the selected rows of each shard to XGBoost, one shard at a time"""
+
+    def __init__(self, shards, select, cache_prefix):
+        self._shards = shards
+        self._select = select
+        self._i = 0
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data):
+        while self._i < len(self._shards):
+            X, y, _ = _load(self._shards[self._i], self._select)
+            self._i += 1
+            if len(y):
+                input_data(data=X, label=y)
+                return True
+        return False
+
+    def reset(self):
+        self._i = 0
+
+
+def _xgb_native_params(params, random_state):
+    native = {k: v for k, v in params.items() if k != "n_estimators"}
+    native.update({
+        "objective": "binary:logistic",
+        "eval_metric": "logloss",
+        "tree_method": "hist",
+        "seed": random_state,
+    })
+    return native, params.get("n_estimators", 100)
+
+
+def fit_xgb_streaming(shards, select, params, cache_dir, random_state=42, feature_names=None):
+    """Train an XGBClassifier from external-memory shards
+
+    feature_names are stored on the booster so the API can place its inputs by name.
+    """
+    native, n_rounds = _xgb_native_params(params, random_state)
+    os.makedirs(cache_dir, exist_ok=True)
+    it = ShardIterator(shards, select, os.path.join(cache_dir, "xgb-cache"))
+    if hasattr(xgb, "ExtMemQuantileDMatrix"):
+        dtrain = xgb.ExtMemQuantileDMatrix(it)
+    else:
+        dtrain = xgb.DMatrix(it)
+    booster = xgb.train(native, dtrain, num_boost_round=n_rounds)
+    del dtrain
+    if feature_names is not None:
+        booster.feature_names = list(feature_names)
+
+    # Round-trip through the model file to get the sklearn wrapper the API uses
+    path = os.path.join(cache_dir, "booster.json")
+    booster.save_model(path)
+    model = xgb.XGBClassifier()
+    model.load_model(path)
+    return model
+
+
+def fit_mlp_streaming(shards, select, params, epochs, random_state=42):
+    """Train an MLPClassifier with partial_fit epochs over shuffled shards"""
+    from sklearn.neural_network import MLPClassifier
+
+    params = {k: v for k, v in params.items() if k not in ("max_iter", "early_stopping")}
+    if params.get("solver", "adam") == "lbfgs":
+        raise ValueError("partial_fit needs solver='adam' or 'sgd'")
+    if "hidden_layer_sizes" in params:
+        params["hidden_layer_sizes"] = tuple(params["hidden_layer_sizes"])
+
+    model = MLPClassifier(random_state=random_state, **params)
+    rng = np.random.default_rng(random_state)
+    for _ in range(epochs):
+        for j in rng.permutation(len(shards)):
+            X, y, _ = _load(shards[j], select)
+            if not len(y):
+                continue
+            order = rng.permutation(len(y))
+            model.partial_fit(X[order], y[order], classes=[0, 1])
+    return model
+
+
+def _predict_rows(model, X):
+    return model.predict_proba(X)[:, 1].astype(np.float32)
+
+
+def train_streaming(csv_path, xgb_params, mlp_params, max_memory_mb=1024, n_folds=3, mlp_epochs=10,
+                    test_size=0.2, embedding_k=None, meta_max_rows=1_000_000, work_dir=None,
+                    random_state=42):
+    """Train the stacked ensemble without loading the dataset into memory
+
+    Returns the fitted models, the embedding projection (or None), the held-out
+    test predictions and timing stats.
+    """
+    from sklearn.linear_model import LogisticRegression
+
+    own_work_dir = work_dir is None
+    work_dir = work_dir or tempfile.mkdtemp(prefix="ecom-ooc-")
+    stats = {}
+    try:
+        start = time.perf_counter()
+        n_columns = len(pd.read_csv(csv_path, nrows=0).columns)
+        chunk_rows = chunk_rows_for_budget(max_memory_mb, n_columns)
+        shards, projection, feature_names = write_shards(
+            csv_path, os.path.join(work_dir, "shards"), chunk_rows, n_folds=n_folds,
+            test_size=test_size, embedding_k=embedding_k, random_state=random_state,
+        )
+        stats.update(chunk_rows=chunk_rows, shards=len(shards), shard_seconds=time.perf_counter() - start)
+
+        # Out-of-fold predictions for the meta-model, one small file per shard
+        start = time.perf_counter()
+        for fold in range(n_folds):
+            def not_fold(s, fold=fold):
+                return (s != TEST_SPLIT) & (s != fold)
+
+            xgb_fold = fit_xgb_streaming(shards, not_fold, xgb_params,
+                                         os.path.join(work_dir, f"fold{fold}"), random_state)
+            mlp_fold = fit_mlp_streaming(shards, not_fold, mlp_params, mlp_epochs, random_state)
+            for base in shards:
+                X, _, mask = _load(base, lambda s, fold=fold: s == fold)
+                oof_path = base + "_oof.npy"
+                oof = np.load(oof_path) if os.path.exists(oof_path) else np.zeros((len(mask), 2), np.float32)
+                if len(X):
+                    oof[mask, 0] = _predict_rows(xgb_fold, X)
+                    oof[mask, 1] = _predict_rows(mlp_fold, X)
+                np.save(oof_path, oof)
+        stats["oof_seconds"] = time.perf_counter() - start
+
+        # Meta-model on a bounded uniform sample of the out-of-fold predictions
+        def is_train(s):
+            return s != TEST_SPLIT
+
+        n_train = sum(int(is_train(np.load(b + "_split.npy")).sum()) for b in shards)
+        keep = min(1.0, meta_max_rows / max(n_train, 1))
+        rng = np.random.default_rng(random_state)
+        stack, target = [], []
+        for base in shards:
+            _, y, mask = _load(base, is_train)
+            sample = rng.random(len(y)) < keep
+            stack.append(np.load(base + "_oof.npy")[mask][sample])
+            target.append(y[sample])
+        meta_model = LogisticRegression(max_iter=1000, random_state=random_state)
+        meta_model.fit(np.concatenate(stack), np.concatenate(target))
+
+        # Final base models on every training row
+        start = time.perf_counter()
+        xgb_model = fit_xgb_streaming(shards, is_train, xgb_params, os.path.join(work_dir, "final"), random_state,
+                                      feature_names=feature_names)
+        mlp_model = fit_mlp_streaming(shards, is_train, mlp_params, mlp_epochs, random_state)
+        stats["final_fit_seconds"] = time.perf_counter() - start
+        stats["train_rows"] = n_train
+
+        y_test, xgb_test, mlp_test = [], [], []
+        for base in shards:
+            X, y, _ = _load(base, lambda s: s == TEST_SPLIT)
+            if len(y):
+                y_test.append(y)
+                xgb_test.append(_predict_rows(xgb_model, X))
+                mlp_test.append(_predict_rows(mlp_model, X))
+        y_test, xgb_test, mlp_test = (np.concatenate(a) for a in (y_test, xgb_test, mlp_test))
+        ensemble_test = meta_model.predict_proba(np.column_stack((xgb_test, mlp_test)))[:, 1]
+    finally:
+        if own_work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        "xgboost": xgb_model,
+        "neural_network": mlp_model,
+        "meta_model": meta_model,
+        "projection": projection,
+        "feature_names": feature_names,
+        "test": {"y": y_test, "xgboost": xgb_test, "neural_network": mlp_test, "ensemble": ensemble_test},
+        "stats": stats,
+    }
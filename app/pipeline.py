@@ -0,0 +1,387 @@
+"""
+Content-hashed, incremental pipeline runner for the data and training stages.
+
+Stages from ``app/stages.py`` form a DAG over file artifacts. Each stage's
+outputs are cached under ``.pipeline-cache/<stage>/<key>/`` where the key hashes
+the content of its input files, the stage function's source, the source of the
+app modules it delegates to (its ``code`` list) and its params.
+Re-runs skip stages whose key is already cached, independent stages run in
+parallel, and outputs with a workspace target (``data/processed/...``,
+``models/optimized/...``) are copied there after each stage.
+
+Usage:
+    uv run python -m app.pipeline                 # build everything
+    uv run python -m app.pipeline --target featured --jobs 4
+    uv run python -m app.pipeline --dry-run       # show what would run
+"""
+import argparse
+import hashlib
+import importlib.util
+import inspect
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from app import stages
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+CACHE_DIR = os.path.join(ROOT, ".pipeline-cache")
+
+
+class Ref:
+    """Reference to the output of an upstream stage"""
+
+    def __init__(self, stage, output):
+        self.stage = stage
+        self.output = output
+
+
+class Stage:
+    def __init__(self, name, fn, inputs, outputs, params=None, removes=(), code=()):
+        self.name = name
+        self.fn = fn
+        # modules (dotted names) whose source the stage's results depend on besides fn itself
+        self.code = list(code)
+        # input name -> workspace path (relative to the repo root) or Ref
+        self.inputs = inputs
+        # output name -> workspace target path, or None to keep it only in the cache
+        self.outputs = outputs
+        self.params = params or {}
+        # workspace files made stale by this stage's outputs, deleted when it materializes
+        self.removes = list(removes)
+
+    @property
+    def upstream(self):
+        return {ref.stage for ref in self.inputs.values() if isinstance(ref, Ref)}
+
+
+def build_stages(embedding_k=64, embedding_method="pca", cascade_max_disagreement=0.01,
+                 train_mode="in-memory", max_memory_mb=1024, n_folds=3, mlp_epochs=10):
+    """The notebook workflow as a DAG
+
+    train_mode="out-of-core" streams the training data from disk instead of
+    loading it, for catalogs that don't fit in RAM.
+    """
+    if train_mode == "out-of-core":
+        if embedding_method != "pca":
+            raise ValueError("out-of-core training only supports PCA embedding projection")
+        train_fn = stages.train_out_of_core
+        train_code = ["app.cascade", "app.out_of_core", "app.reduction"]
+        train_params = {"embedding_k": embedding_k,
+                        "max_memory_mb": max_memory_mb,
+                        "n_folds": n_folds,
+                        "mlp_epochs": mlp_epochs,
+                        "cascade_max_disagreement": cascade_max_disagreement}
+    else:
+        train_fn = stages.train
+        train_code = ["app.cascade", "app.reduction"]
+        train_params = {"embedding_k": embedding_k,
+                        "embedding_method": embedding_method,
+                        "cascade_max_disagreement": cascade_max_disagreement}
+
+    raw = "data/raw/ecommerce_sales.csv"
+    stage_list = [
+        Stage("preprocess", stages.preprocess,
+              inputs={"raw": raw},
+              outputs={"preprocessed": "data/processed/ecommerce_sales_preprocessed.csv",
+                       "scaler": None}),
+        Stage("sales_features", stages.sales_features,
+              inputs={"raw": raw},
+              outputs={"sales_features": None}),
+        Stage("price_buckets", stages.price_buckets,
+              inputs={"raw": raw},
+              outputs={"price_buckets": None,
+                       "price_terciles": None}),
+        Stage("featured", stages.featured,
+              inputs={"raw": raw,
+                      "preprocessed": Ref("preprocess", "preprocessed"),
+                      "sales_features": Ref("sales_features", "sales_features"),
+                      "price_buckets": Ref("price_buckets", "price_buckets")},
+              outputs={"featured": "data/processed/ecommerce_sales_featured.csv"}),
+        Stage("embed", stages.embed_product_names,
+              inputs={"raw": raw},
+              outputs={"embeddings": None},
+              params={"model_name": "distilbert-base-uncased", "max_length": 16, "batch_size": 64}),
+        Stage("join", stages.join_embeddings,
+              inputs={"featured": Ref("featured", "featured"),
+                      "embeddings": Ref("embed", "embeddings")},
+              outputs={"with_embeddings": "data/processed/ecommerce_sales_with_embeddings.csv"}),
+        Stage("train", train_fn,
+              inputs={"with_embeddings": Ref("join", "with_embeddings"),
+                      "scaler": Ref("preprocess", "scaler"),
+                      "price_terciles": Ref("price_buckets", "price_terciles"),
+                      "optimization_results": "models/optimized/optimization_results.json"},
+              outputs={"xgboost": "models/optimized/xgboost_optimized.pkl",
+                       "neural_network": "models/optimized/neural_network_optimized.pkl",
+                       "meta_model": "models/optimized/meta_model_optimized.pkl",
+                       "cascade_bands": "models/optimized/cascade_bands.json",
+                       "feature_scaling": "models/optimized/feature_scaling.json",
+                       "metrics": "models/optimized/training_metrics.json",
+                       "test_predictions": None},
+              params=train_params,
+              code=train_code),
+    ]
+    # The projection only exists when training on reduced embeddings; a stale one
+    # would be applied by the API to models that expect full embeddings
+    train = stage_list[-1]
+    if embedding_k:
+        train.outputs["projection"] = "models/optimized/embedding_projection.npz"
+    else:
+        train.removes.append("models/optimized/embedding_projection.npz")
+
+    stage_list.append(
+        Stage("drift_baseline", stages.drift_baseline,
+              inputs={"raw": raw,
+                      "test_predictions": Ref("train", "test_predictions")},
+              outputs={"baseline": "models/optimized/drift_baseline.json"},
+              params={"n_bins": 100},
+              code=["app.bulk", "app.drift"]))
+    return stage_list
+
+
+# Default file names of cache-only outputs
+_OUTPUT_FILENAMES = {
+    "sales_features": "sales_features.csv",
+    "price_buckets": "price_buckets.csv",
+    "scaler": "scaler.json",
+    "price_terciles": "price_terciles.json",
+    "embeddings": "embeddings.npy",
+    "test_predictions": "test_predictions.npy",
+}
+
+
+def output_filename(name, target):
+    return os.path.basename(target) if target else _OUTPUT_FILENAMES.get(name, name)
+
+
+# (path, size, mtime) -> sha256, for the life of the process
+_file_hashes = {}
+
+
+def file_hash(path):
+    """sha256 of a file, memoized on (path, size, mtime)"""
+    stat = os.stat(path)
+    memo_key = (path, stat.st_size, stat.st_mtime_ns)
+    if memo_key not in _file_hashes:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        _file_hashes[memo_key] = h.hexdigest()
+    return _file_hashes[memo_key]
+
+
+def module_path(name):
+    """Source file of a module, found without importing it"""
+    spec = importlib.util.find_spec(name)
+    if spec is None or not spec.origin or not os.path.isfile(spec.origin):
+        raise ValueError(f"Can't find the source of module {name!r}")
+    return spec.origin
+
+
+def stage_key(stage, input_paths):
+    h = hashlib.sha256()
+    h.update(stage.name.encode())
+    h.update(inspect.getsource(stage.fn).encode())
+    for module in sorted(stage.code):
+        h.update(module.encode())
+        h.update(file_hash(module_path(module)).encode())
+    h.update(json.dumps(stage.params, sort_keys=True, default=str).encode())
+    h.update(json.dumps(sorted(stage.outputs)).encode())
+    for name in sorted(input_paths):
+        h.update(name.encode())
+        h.update(file_hash(input_paths[name]).encode())
+    return h.hexdigest()[:16]
+
+
+def _run_stage(fn, inputs, outputs, params):
+    start = time.perf_counter()
+    fn(inputs, outputs, params)
+    return time.perf_counter() - start
+
+
+def topological_order(stage_list):
+    by_name = {s.name: s for s in stage_list}
+    order, seen = [], set()
+
+    def visit(name, path=()):
+        if name in path:
+            raise ValueError(f"Cycle in pipeline: {' -> '.join(path + (name,))}")
+        if name in seen:
+            return
+        for dep in by_name[name].upstream:
+            if dep not in by_name:
+                raise ValueError(f"Stage {name!r} depends on unknown stage {dep!r}")
+            visit(dep, path + (name,))
+        seen.add(name)
+        order.append(by_name[name])
+
+    for s in stage_list:
+        visit(s.name)
+    return order
+
+
+def select(stage_list, targets):
+    """The target stages and everything upstream of them"""
+    if not targets:
+        return stage_list
+    by_name = {s.name: s for s in stage_list}
+    needed, todo = set(), list(targets)
+    while todo:
+        name = todo.pop()
+        if name not in by_name:
+            raise ValueError(f"Unknown stage: {name}")
+        if name not in needed:
+            needed.add(name)
+            todo.extend(by_name[name].upstream)
+    return [s for s in stage_list if s.name in needed]
+
+
+class Pipeline:
+    def __init__(self, stage_list, root=ROOT, cache_dir=CACHE_DIR, jobs=None):
+        self.stages = topological_order(stage_list)
+        self.root = root
+        self.cache_dir = cache_dir
+        self.jobs = jobs or min(4, os.cpu_count() or 1)
+        # stage name -> output name -> cached path
+        self.produced = {}
+        self.report = []
+
+    def _input_paths(self, stage):
+        paths = {}
+        for name, src in stage.inputs.items():
+            if isinstance(src, Ref):
+                paths[name] = self.produced[src.stage][src.output]
+            else:
+                paths[name] = os.path.join(self.root, src)
+        return paths
+
+    def _cache_paths(self, stage, key):
+        directory = os.path.join(self.cache_dir, stage.name, key)
+        return directory, {name: os.path.join(directory, output_filename(name, target))
+                           for name, target in stage.outputs.items()}
+
+    def _materialize(self, stage, cached):
+        for path in stage.removes:
+            path = os.path.join(self.root, path)
+            if os.path.exists(path):
+                os.remove(path)
+        for name, target in stage.outputs.items():
+            if target is None:
+                continue
+            target_path = os.path.join(self.root, target)
+            if os.path.exists(target_path) and file_hash(target_path) == file_hash(cached[name]):
+                continue
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            shutil.copyfile(cached[name], target_path)
+
+    def _log(self, stage, status, key, seconds):
+        self.report.append({"stage": stage.name, "status": status, "key": key, "seconds": round(seconds, 3)})
+        print(f"[{stage.name}] {status:<9} key={key} {seconds:8.2f}s", flush=True)
+
+    def run(self, force=(), dry_run=False):
+        """Run every stage whose key isn't cached yet, in dependency order"""
+        pending = {s.name: s for s in self.stages}
+        done = set()
+        running = {}
+        stale = set()
+        start = time.perf_counter()
+
+        with ProcessPoolExecutor(max_workers=self.jobs) as pool:
+            while pending or running:
+                ready = [s for s in pending.values() if s.upstream <= done]
+                for stage in ready:
+                    del pending[stage.name]
+                    if stage.upstream & stale:
+                        # Inputs don't exist yet, so neither does the key
+                        self._log(stage, "would run", "?", 0.0)
+                        stale.add(stage.name)
+                        done.add(stage.name)
+                        continue
+                    t0 = time.perf_counter()
+                    key = stage_key(stage, self._input_paths(stage))
+                    directory, cached = self._cache_paths(stage, key)
+
+                    if os.path.isdir(directory) and stage.name not in force:
+                        self.produced[stage.name] = cached
+                        if not dry_run:
+                            self._materialize(stage, cached)
+                        self._log(stage, "cache hit", key, time.perf_counter() - t0)
+                        done.add(stage.name)
+                        continue
+                    if dry_run:
+                        self._log(stage, "would run", key, 0.0)
+                        stale.add(stage.name)
+                        done.add(stage.name)
+                        continue
+
+                    tmp_dir = f"{directory}.tmp-{os.getpid()}"
+                    shutil.rmtree(tmp_dir, ignore_errors=True)
+                    os.makedirs(tmp_dir)
+                    tmp_outputs = {name: os.path.join(tmp_dir, os.path.basename(path))
+                                   for name, path in cached.items()}
+                    future = pool.submit(_run_stage, stage.fn, self._input_paths(stage),
+                                         tmp_outputs, stage.params)
+                    running[future] = (stage, key, directory, tmp_dir, cached)
+
+                if not running:
+                    if pending and not ready:
+                        raise RuntimeError(f"Pipeline stuck, unresolved stages: {sorted(pending)}")
+                    continue
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    stage, key, directory, tmp_dir, cached = running.pop(future)
+                    try:
+                        seconds = future.result()
+                    except Exception:
+                        shutil.rmtree(tmp_dir, ignore_errors=True)
+                        for other in running:
+                            other.cancel()
+                        print(f"[{stage.name}] failed", file=sys.stderr, flush=True)
+                        raise
+                    missing = [p for p in cached.values()
+                               if not os.path.exists(os.path.join(tmp_dir, os.path.basename(p)))]
+                    if missing:
+                        shutil.rmtree(tmp_dir, ignore_errors=True)
+                        raise RuntimeError(f"Stage {stage.name!r} did not write {missing}")
+                    shutil.rmtree(directory, ignore_errors=True)
+                    os.replace(tmp_dir, directory)
+                    self.produced[stage.name] = cached
+                    self._materialize(stage, cached)
+                    self._log(stage, "ran", key, seconds)
+                    done.add(stage.name)
+
+        hits = sum(r["status"] == "cache hit" for r in self.report)
+        print(f"Pipeline finished in {time.perf_counter() - start:.2f}s "
+              f"({hits}/{len(self.report)} stages from cache)", flush=True)
+        return self.report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the data/training pipeline incrementally")
+    parser.add_argument("--target", nargs="*", default=[], help="stages to build (default: all)")
+    parser.add_argument("--force", nargs="*", default=[], help="stages to re-run even if cached")
+    parser.add_argument("--jobs", type=int, default=None, help="stages to run in parallel")
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--embedding-k", type=int, default=64, help="0 trains on full embeddings")
+    parser.add_argument("--embedding-method", choices=["pca", "random"], default="pca")
+    parser.add_argument("--cascade-max-disagreement", type=float, default=0.01)
+    parser.add_argument("--train-mode", choices=["in-memory", "out-of-core"], default="in-memory")
+    parser.add_argument("--max-memory-mb", type=int, default=1024,
+                        help="out-of-core: memory budget for streamed feature chunks")
+    parser.add_argument("--n-folds", type=int, default=3, help="out-of-core: folds for out-of-fold stacking")
+    parser.add_argument("--mlp-epochs", type=int, default=10, help="out-of-core: partial_fit epochs")
+    args = parser.parse_args(argv)
+
+    stage_list = build_stages(args.embedding_k or None, args.embedding_method, args.cascade_max_disagreement,
+                              args.train_mode, args.max_memory_mb, args.n_folds, args.mlp_epochs)
+    pipeline = Pipeline(select(stage_list, args.target), jobs=args.jobs)
+    pipeline.run(force=set(args.force), dry_run=args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
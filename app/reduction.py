@@ -0,0 +1,92 @@
+"""
+Reduced-dimension embedding stage.
+
+768 of the 796 model inputs are raw DistilBERT CLS dimensions. A projection fitted
+at training time maps them down to ``k`` dimensions before they reach the
+XGBoost/MLP models. Only the projection matrix and centering vector are stored
+(``models/optimized/embedding_projection.npz``), so serving needs nothing but a
+matrix multiply.
+"""
+import os
+
+import numpy as np
+
+EMBEDDING_PREFIX = "emb_"
+PROJECTION_FILENAME = "embedding_projection.npz"
+
+
+def fit_embedding_projection(embeddings, k, method="pca", random_state=42):
+    """Fit a k-dimensional projection on training embeddings
+
+    method is "pca" (variance-preserving, centered) or "random" (Gaussian random
+    projection, no fitting cost, distances preserved in expectation).
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float64)
+    n_dims = embeddings.shape[1]
+    if not 0 < k <= n_dims:
+        raise ValueError(f"k must be in [1, {n_dims}], got {k}")
+
+    if method == "pca":
+        from sklearn.decomposition import PCA
+        pca = PCA(n_components=k, random_state=random_state).fit(embeddings)
+        components, mean = pca.components_, pca.mean_
+        explained = float(pca.explained_variance_ratio_.sum())
+    elif method == "random":
+        from sklearn.random_projection import GaussianRandomProjection
+        rp = GaussianRandomProjection(n_components=k, random_state=random_state).fit(embeddings)
+        components, mean = rp.components_, np.zeros(n_dims)
+        explained = None
+    else:
+        raise ValueError(f"Unknown projection method: {method}")
+
+    return {
+        "method": method,
+        "components": components.astype(np.float32),
+        "mean": mean.astype(np.float32),
+        "explained_variance": explained,
+    }
+
+
+def project_embeddings(projection, embeddings):
+    """Project (n, 768) or (768,) embeddings to k dimensions"""
+    return (np.asarray(embeddings, dtype=np.float32) - projection["mean"]) @ projection["components"].T
+
+
+def embedding_columns(df):
+    return [col for col in df.columns if col.startswith(EMBEDDING_PREFIX)]
+
+
+def reduce_feature_frame(X, projection):
+    """Replace the emb_* columns of a feature frame with the k projected columns"""
+    import pandas as pd
+
+    emb_cols = embedding_columns(X)
+    reduced = project_embeddings(projection, X[emb_cols].to_numpy())
+    reduced_cols = [f"{EMBEDDING_PREFIX}{projection['method']}_{i}" for i in range(reduced.shape[1])]
+    reduced_df = pd.DataFrame(reduced, columns=reduced_cols, index=X.index)
+    return pd.concat([X.drop(columns=emb_cols), reduced_df], axis=1)
+
+
+def save_embedding_projection(projection, model_dir):
+    path = os.path.join(model_dir, PROJECTION_FILENAME)
+    np.savez(
+        path,
+        method=projection["method"],
+        components=projection["components"],
+        mean=projection["mean"],
+    )
+    return path
+
+
+def load_embedding_projection(model_dir):
+    """Load the stored projection, or None when models were trained on full embeddings"""
+    path = os.path.join(model_dir, PROJECTION_FILENAME)
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        return {
+            "method": str(data["method"]),
+            "components": data["components"],
+            "mean": data["mean"],
+            "explained_variance": None,
+        }
@@ -0,0 +1,196 @@
+"""
+Multi-process serving for the prediction API.
+
+The models, tokenizer and product catalog are loaded once in the parent process
+(by importing ``app.api``) and the workers are forked from it afterwards, so the
+weights are shared copy-on-write instead of being loaded once per worker.
+
+Usage:
+    uv run python -m app.serve --workers 4 --port 8000
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+
+import torch
+import uvicorn
+
+from app.admission import available_cores, limits_from_env
+
+# A worker that dies sooner than this after being forked counts as a failed start;
+# restarts back off exponentially and give up after MAX_RAPID_FAILURES in a row
+MIN_UPTIME_S = 10.0
+RESTART_BACKOFF_S = 0.5
+MAX_RESTART_BACKOFF_S = 30.0
+MAX_RAPID_FAILURES = 5
+
+
+def default_threads_per_worker(workers):
+    """Split the cores this process may run on evenly so workers don't oversubscribe the CPU"""
+    return max(1, available_cores() // workers)
+
+
+def pin_torch_threads(threads):
+    """Pin torch intra-op (and, when still allowed, inter-op) threads for this process"""
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Inter-op pool already started in this process, keep its size
+        pass
+
+
+def process_memory(pid):
+    """Return RSS and PSS (proportional, shared pages split between sharers) in kB"""
+    memory = {"rss_kb": 0, "pss_kb": 0}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Rss:"):
+                    memory["rss_kb"] = int(line.split()[1])
+                elif line.startswith("Pss:"):
+                    memory["pss_kb"] = int(line.split()[1])
+    except OSError:
+        pass
+    return memory
+
+
+def _bind_socket(host, port):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(app, sock, threads):
+    # Children must not run the parent's signal forwarding
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    pin_torch_threads(threads)
+    # Admit as many concurrent requests as this worker has cores
+    from app import api
+    if api.admission is not None:
+        api.admission.resize(*limits_from_env(threads))
+
+    config = uvicorn.Config(app, log_level="info", access_log=False)
+    server = uvicorn.Server(config)
+    server.run(sockets=[sock])
+
+
+def _spawn(app, sock, threads):
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            _run_worker(app, sock, threads)
+        except BaseException:
+            import traceback
+            traceback.print_exc()
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+
+def restart_delay(rapid_failures):
+    """Seconds to wait before re-forking after this many failed starts in a row"""
+    if not rapid_failures:
+        return 0.0
+    return min(MAX_RESTART_BACKOFF_S, RESTART_BACKOFF_S * 2 ** (rapid_failures - 1))
+
+
+def count_rapid_failures(rapid_failures, uptime):
+    """Failed starts in a row once a worker exits after ``uptime`` seconds (None: not one we forked)"""
+    if uptime is not None and uptime < MIN_UPTIME_S:
+        return rapid_failures + 1
+    return 0
+
+
+def serve(workers, host="127.0.0.1", port=8000, threads_per_worker=None):
+    """Load everything once, then fork ``workers`` uvicorn workers sharing one socket
+
+    Returns 0 after a clean shutdown, 1 when workers kept dying on startup.
+    """
+    if not hasattr(os, "fork"):
+        raise RuntimeError("Multi-process serving needs os.fork; use `uvicorn app.api:app` on this platform")
+
+    threads = threads_per_worker or default_threads_per_worker(workers)
+
+    # Heavy lifting happens here, exactly once
+    start = time.perf_counter()
+    from app import api
+    print(f"Loaded models and catalog in {time.perf_counter() - start:.1f}s (pid {os.getpid()})")
+
+    # Move everything allocated so far out of the GC's reach. Otherwise every
+    # collection in a worker touches the object headers and un-shares the pages.
+    gc.collect()
+    gc.freeze()
+
+    sock = _bind_socket(host, port)
+    children = {}  # pid -> fork time
+    shutting_down = threading.Event()
+    rapid_failures = 0
+    exit_code = 0
+
+    def _forward(signum, frame):
+        shutting_down.set()
+        for child in list(children):
+            try:
+                os.kill(child, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, _forward)
+    signal.signal(signal.SIGTERM, _forward)
+
+    for _ in range(workers):
+        children[_spawn(api.app, sock, threads)] = time.monotonic()
+    print(f"Serving on http://{host}:{port} with {workers} workers x {threads} torch threads")
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        started = children.pop(pid, None)
+        if shutting_down.is_set():
+            continue
+        rapid_failures = count_rapid_failures(rapid_failures, None if started is None else time.monotonic() - started)
+        if rapid_failures >= MAX_RAPID_FAILURES:
+            print(f"Worker {pid} exited with status {status}; {rapid_failures} workers in a row died "
+                  f"within {MIN_UPTIME_S:.0f}s of starting, giving up", file=sys.stderr)
+            exit_code = 1
+            _forward(signal.SIGTERM, None)
+            continue
+        delay = restart_delay(rapid_failures)
+        print(f"Worker {pid} exited with status {status}, restarting" + (f" in {delay:.1f}s" if delay else ""))
+        # Returns as soon as a shutdown signal arrives instead of sleeping out the backoff
+        if not shutting_down.wait(delay):
+            children[_spawn(api.app, sock, threads)] = time.monotonic()
+
+    sock.close()
+    return exit_code
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the prediction API with forked, model-sharing workers")
+    parser.add_argument("--workers", type=int, default=available_cores())
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--threads-per-worker", type=int, default=None,
+                        help="torch intra-op threads per worker (default: cores // workers)")
+    args = parser.parse_args(argv)
+    return serve(args.workers, args.host, args.port, args.threads_per_worker)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,286 @@
+"""
+Data pipeline stages, extracted from the notebooks.
+
+Each stage is a plain function ``stage(inputs, outputs, params)`` taking dicts of
+input paths, output paths and parameters. ``app/pipeline.py`` wires them into a
+DAG and caches their outputs under a hash of their inputs, source and params, so
+keep each stage self-contained: changing a stage's body re-runs only that stage
+and whatever depends on its outputs. Work delegated to other app modules must be
+listed in the stage's ``code`` in app/pipeline.py so their changes count too.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+
+# ------------------- data_preprocessing.ipynb -------------------
+def preprocess(inputs, outputs, params):
+    """Total/average sales, success target, standardized numerics, one-hot category"""
+    from sklearn.preprocessing import StandardScaler
+
+    df = pd.read_csv(inputs["raw"])
+
+    sales_cols = [col for col in df.columns if 'sales_month' in col]
+    df['total_sales'] = df[sales_cols].sum(axis=1)
+    df['avg_sales_per_month'] = df[sales_cols].mean(axis=1)
+
+    threshold = df['total_sales'].median()
+    df['success'] = np.where(df['total_sales'] > threshold, 1, 0)
+
+    num_cols = ['price', 'review_score', 'review_count', 'total_sales', 'avg_sales_per_month']
+    scaler = StandardScaler()
+    df[num_cols] = scaler.fit_transform(df[num_cols])
+
+    df = pd.get_dummies(df, columns=['category'], drop_first=True)
+    df.to_csv(outputs["preprocessed"], index=False)
+    # Serving standardizes with the same statistics
+    with open(outputs["scaler"], "w") as f:
+        json.dump({"standardized": num_cols, "mean": scaler.mean_.tolist(), "std": scaler.scale_.tolist()}, f)
+
+
+# ------------------- feature_engineering.ipynb -------------------
+def sales_features(inputs, outputs, params):
+    """Sales variability and last-3 over first-3 month trend from raw monthly sales"""
+    raw_df = pd.read_csv(inputs["raw"])
+    sales_cols = [col for col in raw_df.columns if 'sales_month' in col]
+
+    features = pd.DataFrame(index=raw_df.index)
+    features['sales_variability'] = raw_df[sales_cols].std(axis=1)
+    first_3_months = raw_df[sales_cols[:3]].mean(axis=1)
+    last_3_months = raw_df[sales_cols[-3:]].mean(axis=1)
+    features['sales_trend'] = np.where(first_3_months > 0, last_3_months / first_3_months, 1)
+    features.to_csv(outputs["sales_features"], index=False)
+
+
+def price_buckets(inputs, outputs, params):
+    """Tercile price buckets, one-hot encoded with Low as the reference level"""
+    raw_df = pd.read_csv(inputs["raw"])
+
+    terciles = [float(raw_df['price'].quantile(0.33)), float(raw_df['price'].quantile(0.66))]
+    price_bins = [-np.inf, *terciles, np.inf]
+    price_labels = ['Low', 'Medium', 'High']
+    buckets = pd.DataFrame({'price_bucket': pd.cut(raw_df['price'], bins=price_bins, labels=price_labels)})
+    buckets = pd.get_dummies(buckets, columns=['price_bucket'], drop_first=True)
+    buckets.to_csv(outputs["price_buckets"], index=False)
+    with open(outputs["price_terciles"], "w") as f:
+        json.dump(terciles, f)
+
+
+def featured(inputs, outputs, params):
+    """Merge preprocessed data with the raw monthly sales and engineered features"""
+    df = pd.read_csv(inputs["preprocessed"])
+    raw_df = pd.read_csv(inputs["raw"])
+    sales_cols = [col for col in raw_df.columns if 'sales_month' in col]
+
+    df[sales_cols] = raw_df[sales_cols]
+    df = pd.concat([df, pd.read_csv(inputs["sales_features"]), pd.read_csv(inputs["price_buckets"])], axis=1)
+    df.to_csv(outputs["featured"], index=False)
+
+
+# ------------------- text_processing.ipynb -------------------
+def embed_product_names(inputs, outputs, params):
+    """DistilBERT CLS embeddings of product names, in row order of the raw data"""
+    import torch
+    from transformers import AutoTokenizer, AutoModel
+
+    names = pd.read_csv(inputs["raw"], usecols=['product_name'])['product_name'].astype(str).tolist()
+
+    tokenizer = AutoTokenizer.from_pretrained(params["model_name"])
+    model = AutoModel.from_pretrained(params["model_name"])
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    model.to(device)
+
+    batch_size = params["batch_size"]
+    embeddings = []
+    for start in range(0, len(names), batch_size):
+        inputs_ = tokenizer(names[start:start + batch_size], return_tensors="pt",
+                            truncation=True, padding=True, max_length=params["max_length"])
+        inputs_ = {k: v.to(device) for k, v in inputs_.items()}
+        with torch.no_grad():
+            out = model(**inputs_)
+        embeddings.append(out.last_hidden_state[:, 0, :].cpu().numpy())
+
+    np.save(outputs["embeddings"], np.concatenate(embeddings).astype(np.float32))
+
+
+def join_embeddings(inputs, outputs, params):
+    """Featured data plus emb_* columns, product_name dropped to avoid leakage"""
+    df = pd.read_csv(inputs["featured"])
+    embeddings = np.load(inputs["embeddings"])
+    emb_df = pd.DataFrame(embeddings, columns=[f'emb_{i}' for i in range(embeddings.shape[1])])
+    df_combined = pd.concat([df.drop(columns=['product_name']), emb_df], axis=1)
+    df_combined.to_csv(outputs["with_embeddings"], index=False)
+
+
+# ------------------- model_training_optimized.ipynb -------------------
+def train(inputs, outputs, params):
+    """Fit XGBoost, MLP and the stacking meta-model with the tuned hyperparameters
+
+    Hyperparameter search stays in the notebook; this refits its best parameters
+    (models/optimized/optimization_results.json) and also writes the embedding
+    projection, calibrated cascade bands and the feature scaling serving needs
+    next to the models.
+    """
+    import joblib
+    import xgboost as xgb
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.metrics import accuracy_score, f1_score, roc_auc_score
+    from sklearn.model_selection import train_test_split
+    from sklearn.neural_network import MLPClassifier
+
+    from app.cascade import calibrate_on_holdout, served_proba
+    from app.reduction import embedding_columns, fit_embedding_projection, reduce_feature_frame
+
+    with open(inputs["optimization_results"]) as f:
+        best = json.load(f)
+
+    df = pd.read_csv(inputs["with_embeddings"])
+    X = df.drop(columns=['success'])
+    y = df['success']
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, stratify=y, random_state=42
+    )
+
+    projection = None
+    if params["embedding_k"]:
+        projection = fit_embedding_projection(
+            X_train[embedding_columns(X_train)], params["embedding_k"], method=params["embedding_method"]
+        )
+        X_train = reduce_feature_frame(X_train, projection)
+        X_test = reduce_feature_frame(X_test, projection)
+
+    xgb_model = xgb.XGBClassifier(random_state=42, eval_metric='logloss', n_jobs=-1,
+                                  **best['xgboost']['best_params'])
+    mlp_params = dict(best['neural_network']['best_params'])
+    mlp_params['hidden_layer_sizes'] = tuple(mlp_params['hidden_layer_sizes'])
+    mlp_model = MLPClassifier(random_state=42, early_stopping=True, validation_fraction=0.1,
+                              n_iter_no_change=10, **mlp_params)
+    xgb_model.fit(X_train, y_train)
+    mlp_model.fit(X_train, y_train)
+
+    stack_train = np.column_stack((xgb_model.predict_proba(X_train)[:, 1], mlp_model.predict_proba(X_train)[:, 1]))
+    meta_model = LogisticRegression(max_iter=1000, random_state=42).fit(stack_train, y_train)
+
+    xgb_test_proba = xgb_model.predict_proba(X_test)[:, 1]
+    mlp_test_proba = mlp_model.predict_proba(X_test)[:, 1]
+    ensemble_proba = meta_model.predict_proba(np.column_stack((xgb_test_proba, mlp_test_proba)))[:, 1]
+
+    joblib.dump(xgb_model, outputs["xgboost"])
+    joblib.dump(mlp_model, outputs["neural_network"])
+    joblib.dump(meta_model, outputs["meta_model"])
+    if projection is not None:
+        from app.reduction import save_embedding_projection
+        save_embedding_projection(projection, os.path.dirname(outputs["projection"]))
+
+    # Training statistics serving standardizes and buckets with, tied to these model inputs
+    with open(inputs["scaler"]) as f:
+        scaling = json.load(f)
+    with open(inputs["price_terciles"]) as f:
+        scaling["price_terciles"] = json.load(f)
+    scaling["feature_names"] = [name for name in X_train.columns if not name.startswith('emb_')]
+    with open(outputs["feature_scaling"], "w") as f:
+        json.dump(scaling, f, indent=4)
+
+    # Bands are calibrated on half of the test rows; the other half measures them
+    bands = calibrate_on_holdout(xgb_test_proba, ensemble_proba,
+                                 max_disagreement=params["cascade_max_disagreement"])
+    with open(outputs["cascade_bands"], "w") as f:
+        json.dump(bands, f, indent=4)
+    # What /predict serves for these rows, the drift baseline of success_probability
+    np.save(outputs["test_predictions"], served_proba(bands, xgb_test_proba, ensemble_proba))
+
+    metrics = {"cascade": bands["evaluation"]}
+    for name, proba in [('xgboost', xgb_test_proba), ('neural_network', mlp_test_proba), ('ensemble', ensemble_proba)]:
+        pred = (proba >= 0.5).astype(int)
+        metrics[name] = {
+            'accuracy': accuracy_score(y_test, pred),
+            'f1_score': f1_score(y_test, pred),
+            'roc_auc': roc_auc_score(y_test, proba)
+        }
+    with open(outputs["metrics"], "w") as f:
+        json.dump(metrics, f, indent=4)
+
+
+def train_out_of_core(inputs, outputs, params):
+    """Same models as train(), streamed from disk with bounded memory (app/out_of_core.py)"""
+    import joblib
+    from sklearn.metrics import accuracy_score, f1_score, roc_auc_score
+
+    from app.cascade import calibrate_on_holdout, served_proba
+    from app.out_of_core import train_streaming
+
+    with open(inputs["optimization_results"]) as f:
+        best = json.load(f)
+
+    result = train_streaming(
+        inputs["with_embeddings"],
+        best['xgboost']['best_params'],
+        best['neural_network']['best_params'],
+        max_memory_mb=params["max_memory_mb"],
+        n_folds=params["n_folds"],
+        mlp_epochs=params["mlp_epochs"],
+        embedding_k=params["embedding_k"],
+    )
+
+    joblib.dump(result["xgboost"], outputs["xgboost"])
+    joblib.dump(result["neural_network"], outputs["neural_network"])
+    joblib.dump(result["meta_model"], outputs["meta_model"])
+    if result["projection"] is not None:
+        from app.reduction import save_embedding_projection
+        save_embedding_projection(result["projection"], os.path.dirname(outputs["projection"]))
+
+    # Training statistics serving standardizes and buckets with, tied to these model inputs
+    with open(inputs["scaler"]) as f:
+        scaling = json.load(f)
+    with open(inputs["price_terciles"]) as f:
+        scaling["price_terciles"] = json.load(f)
+    feature_names = result["xgboost"].get_booster().feature_names
+    scaling["feature_names"] = [name for name in feature_names if not name.startswith('emb_')]
+    with open(outputs["feature_scaling"], "w") as f:
+        json.dump(scaling, f, indent=4)
+
+    test = result["test"]
+    bands = calibrate_on_holdout(test["xgboost"], test["ensemble"],
+                                 max_disagreement=params["cascade_max_disagreement"])
+    with open(outputs["cascade_bands"], "w") as f:
+        json.dump(bands, f, indent=4)
+    np.save(outputs["test_predictions"], served_proba(bands, test["xgboost"], test["ensemble"]))
+
+    metrics = {"out_of_core": result["stats"], "cascade": bands["evaluation"]}
+    for name in ('xgboost', 'neural_network', 'ensemble'):
+        pred = (test[name] >= 0.5).astype(int)
+        metrics[name] = {
+            'accuracy': accuracy_score(test["y"], pred),
+            'f1_score': f1_score(test["y"], pred),
+            'roc_auc': roc_auc_score(test["y"], test[name])
+        }
+    with open(outputs["metrics"], "w") as f:
+        json.dump(metrics, f, indent=4)
+
+
+# ------------------- drift monitoring -------------------
+def drift_baseline(inputs, outputs, params):
+    """Training distribution of the raw model inputs and of the served held-out predictions (app/drift.py)"""
+    from app.bulk import sales_summary
+    from app.drift import fit_drift_baseline
+
+    raw_df = pd.read_csv(inputs["raw"])
+    sales_cols = [col for col in raw_df.columns if 'sales_month' in col]
+    # One value per catalog row, with the sales features computed as the API
+    # does (bulk.sales_summary), so only real drift shows up
+    total_sales, avg_sales, sales_variability, sales_trend = sales_summary(raw_df[sales_cols].to_numpy(dtype=np.float64))
+
+    baseline = fit_drift_baseline({
+        "price": raw_df['price'],
+        "review_score": raw_df['review_score'],
+        "review_count": raw_df['review_count'],
+        "total_sales": total_sales,
+        "avg_sales_per_month": avg_sales,
+        "sales_variability": sales_variability,
+        "sales_trend": sales_trend,
+        "success_probability": np.load(inputs["test_predictions"]),
+    }, n_bins=params["n_bins"])
+    with open(outputs["baseline"], "w") as f:
+        json.dump(baseline, f)
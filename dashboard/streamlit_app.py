@@ -548,7 +548,9 @@ with col1:
         else:
             try:
                 # Call FastAPI endpoint
-                response = requests.post("http://localhost:8000/predict", json={"product_name": product_name})
+                # Bounded wait: connect timeout, read timeout, and the same budget as the server-side deadline
+                response = requests.post("http://localhost:8000/predict", json={"product_name": product_name},
+                                         headers={"X-Request-Timeout-Ms": "10000"}, timeout=(3.05, 10))
                 
                 if response.status_code == 200:
                     result = response.json()
@@ -586,8 +588,13 @@ with col1:
                         st.write(f"**Product:** {result['product_name']}")
                         st.progress(float(result["success_probability"]))
 
+                elif response.status_code in (503, 504):
+                    retry_after = response.headers.get("Retry-After", "a few")
+                    st.warning(f"⏳ The prediction service is busy. Please retry in {retry_after} seconds.")
                 else:
                     st.error(f"Server Error: {response.status_code}")
+            except requests.exceptions.Timeout:
+                st.warning("⏳ The prediction service took too long to respond. Please try again.")
             except Exception as e:
                 st.error(f"Connection Failed ❌\n{e}")
 
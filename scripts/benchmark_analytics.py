@@ -0,0 +1,104 @@
+"""
+Latency of top-k / bottom-k analytics queries on a large synthetic catalog.
+
+Compares app/analytics.py (argpartition-built, incrementally maintained heaps)
+with the notebook's pandas approach (nsmallest / sort_values on every query).
+
+Usage:
+    uv run python scripts/benchmark_analytics.py --products 2000000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from app.analytics import ProductRanking  # noqa: E402
+
+CATEGORIES = ["Books", "Clothing", "Electronics", "Health", "Home & Kitchen", "Sports", "Toys"]
+
+
+def make_catalog(n, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "product_id": np.arange(1, n + 1),
+        "product_name": np.array([f"Product {i}" for i in range(n)], dtype=object),
+        "category": rng.choice(CATEGORIES, size=n),
+        "price": rng.uniform(5, 500, size=n).round(2),
+        "review_score": rng.uniform(1, 5, size=n).round(1),
+        "review_count": rng.integers(0, 1000, size=n),
+    })
+    sales = rng.integers(0, 1000, size=(n, 12))
+    for m in range(12):
+        df[f"sales_month_{m + 1}"] = sales[:, m]
+    return df
+
+
+def timed_ms(fn, repeat=20):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return float(np.median(times))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=2_000_000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--updates", type=int, default=10000)
+    args = parser.parse_args()
+
+    print(f"Generating {args.products:,} products...")
+    df = make_catalog(args.products)
+
+    start = time.perf_counter()
+    ranking = ProductRanking(df)
+    print(f"Index build: {time.perf_counter() - start:.2f}s")
+
+    k = args.k
+    results = []
+
+    start = time.perf_counter()
+    ranking.query("selling_percentage", k, "bottom")
+    results.append(("first query, builds heap", (time.perf_counter() - start) * 1000))
+    results.append(("bottom-k, whole catalog",
+                    timed_ms(lambda: ranking.query("selling_percentage", k, "bottom"))))
+    ranking.query("sales_per_dollar", k, "top", "Toys")
+    results.append(("top-k, one category",
+                    timed_ms(lambda: ranking.query("sales_per_dollar", k, "top", "Toys"))))
+
+    rng = np.random.default_rng(1)
+    ids = rng.integers(1, args.products + 1, size=args.updates)
+    sales = rng.integers(0, 1000, size=(args.updates, 12))
+    start = time.perf_counter()
+    for pid, monthly in zip(ids.tolist(), sales):
+        ranking.update_product(pid, monthly_sales=monthly)
+    per_update = (time.perf_counter() - start) * 1000 / args.updates
+    results.append(("update one product", per_update))
+    results.append(("bottom-k after updates",
+                    timed_ms(lambda: ranking.query("selling_percentage", k, "bottom"))))
+
+    # Notebook approach: recompute the metric and select on every request
+    sales_cols = [c for c in df.columns if c.startswith("sales_month_")]
+    df["total_sales"] = df[sales_cols].sum(axis=1)
+    df["selling_percentage"] = df["total_sales"] / df["total_sales"].max() * 100
+    results.append(("pandas nsmallest", timed_ms(lambda: df.nsmallest(k, "selling_percentage"), repeat=5)))
+    results.append(("pandas sort_values",
+                    timed_ms(lambda: df.sort_values("selling_percentage").head(k), repeat=3)))
+    toys = df["category"] == "Toys"
+    results.append(("pandas per-category filter + nsmallest",
+                    timed_ms(lambda: df[toys].nsmallest(k, "selling_percentage"), repeat=5)))
+
+    print()
+    print(pd.DataFrame(results, columns=["operation", "median_ms"]).round(3).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
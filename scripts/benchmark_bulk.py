@@ -0,0 +1,137 @@
+"""
+Serialization overhead of /predict/batch: JSON vs Arrow IPC.
+
+Times everything around inference, which is identical for both formats:
+client encode, server decode + validation into the (n, 15) numeric model input,
+response encode and client decode. Payloads are product names (catalog lookup),
+raw feature rows, and raw rows carrying a 64-d embedding.
+
+Usage:
+    uv run python scripts/benchmark_bulk.py --rows 1000 100000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from app.bulk import (CATEGORIES, ProductCatalog, batch_features, json_columns, json_results,  # noqa: E402
+                      load_feature_scaling, read_arrow_columns, write_arrow_results)
+
+
+def make_rows(catalog_df, n, kind, emb_dim=64, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({"product_name": rng.choice(catalog_df["product_name"].to_numpy(), size=n)})
+    if kind != "names":
+        df["category"] = rng.choice(CATEGORIES + ["Books"], size=n)
+        df["price"] = rng.uniform(5, 500, size=n).round(2)
+        df["review_score"] = rng.uniform(1, 5, size=n).round(1)
+        df["review_count"] = rng.integers(0, 1000, size=n).astype(float)
+        df["monthly_sales"] = list(rng.integers(0, 1000, size=(n, 12)).astype(float))
+    if kind == "raw+emb":
+        df["embedding"] = list(rng.normal(size=(n, emb_dim)).astype(np.float32))
+    return df
+
+
+def json_request(df):
+    records = df.to_dict("records")
+    for r in records:
+        for key in ("monthly_sales", "embedding"):
+            if key in r:
+                r[key] = r[key].tolist()
+    return json.dumps({"products": records}).encode()
+
+
+def arrow_request(df):
+    columns = {c: df[c].to_numpy() for c in df.columns if c not in ("monthly_sales", "embedding")}
+    table = pa.table(columns)
+    if "monthly_sales" in df:
+        monthly = np.stack(df["monthly_sales"].to_numpy())
+        for m in range(monthly.shape[1]):
+            table = table.append_column(f"sales_month_{m + 1}", pa.array(monthly[:, m]))
+    if "embedding" in df:
+        emb = np.stack(df["embedding"].to_numpy())
+        for d in range(emb.shape[1]):
+            table = table.append_column(f"emb_{d}", pa.array(emb[:, d]))
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def run(fmt, df, catalog, repeat):
+    rng = np.random.default_rng(1)
+    encode, decode, write = {
+        "json": (json_request, json_columns, json_results),
+        "arrow": (arrow_request, read_arrow_columns, lambda names, proba, stage, found: write_arrow_results(proba, stage, found)),
+    }[fmt]
+    encode_ms, body = timed(lambda: encode(df), repeat)
+
+    def server_decode():
+        columns = decode(body)
+        batch_features(columns, catalog)
+        return columns
+    decode_ms, columns = timed(server_decode, repeat)
+
+    n = len(df)
+    proba, stage, found = rng.random(n), rng.integers(0, 2, size=n).astype(np.int8), np.ones(n, dtype=bool)
+    respond_ms, response = timed(lambda: write(columns["product_name"], proba, stage, found), repeat)
+    if fmt == "json":
+        client_ms, _ = timed(lambda: json.loads(response), repeat)
+    else:
+        client_ms, _ = timed(lambda: pa.ipc.open_stream(response).read_all().column("success_probability").to_numpy(), repeat)
+    return {
+        "request_kb": round(len(body) / 1024),
+        "response_kb": round(len(response) / 1024),
+        "client_encode_ms": round(encode_ms, 2),
+        "server_decode_ms": round(decode_ms, 2),
+        "server_encode_ms": round(respond_ms, 2),
+        "client_decode_ms": round(client_ms, 2),
+        "server_total_ms": round(decode_ms + respond_ms, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 100000])
+    parser.add_argument("--catalog", default=os.path.join(ROOT, "data/raw/ecommerce_sales.csv"))
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    catalog_df = pd.read_csv(args.catalog)
+    catalog = ProductCatalog(catalog_df, load_feature_scaling(os.path.join(ROOT, "models/optimized")))
+
+    results = []
+    for n in args.rows:
+        for kind in ("names", "raw", "raw+emb"):
+            df = make_rows(catalog_df, n, kind)
+            for fmt in ("json", "arrow"):
+                results.append({"rows": n, "payload": kind, "format": fmt, **run(fmt, df, catalog, args.repeat)})
+                print(results[-1])
+
+    print()
+    table = pd.DataFrame(results)
+    print(table.to_string(index=False))
+    speedup = table.pivot_table(index=["rows", "payload"], columns="format", values="server_total_ms")
+    print("\nServer-side serialization speedup (json / arrow):")
+    print((speedup["json"] / speedup["arrow"]).round(1).to_string())
+
+
+if __name__ == "__main__":
+    main()
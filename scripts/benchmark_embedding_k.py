@@ -0,0 +1,128 @@
+"""
+Accuracy/ROC-AUC vs inference latency for several embedding projection sizes k.
+
+Uses the same train/test split and the tuned hyperparameters stored in
+models/optimized/optimization_results.json, so only k changes between rows.
+Needs data/processed/ecommerce_sales_with_embeddings.csv (notebooks/text_processing.ipynb).
+
+Usage:
+    uv run python scripts/benchmark_embedding_k.py --k 8 16 32 64 128 768 --method pca
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, roc_auc_score
+from sklearn.model_selection import train_test_split
+from sklearn.neural_network import MLPClassifier
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from app.reduction import embedding_columns, fit_embedding_projection, project_embeddings  # noqa: E402
+
+
+def single_row_latency_ms(models, X, n=200):
+    """Mean latency of the projection + full stacked ensemble on one row at a time"""
+    xgb_model, mlp_model, meta_model, projection, business_cols, emb_cols = models
+    rows = X.sample(n=min(n, len(X)), replace=len(X) < n, random_state=0)
+    business = rows[business_cols].to_numpy(dtype=np.float64)
+    emb = rows[emb_cols].to_numpy(dtype=np.float32)
+
+    start = time.perf_counter()
+    for i in range(len(rows)):
+        e = emb[i] if projection is None else project_embeddings(projection, emb[i])
+        x = np.concatenate([business[i], e]).reshape(1, -1)
+        stack = np.column_stack((xgb_model.predict_proba(x)[:, 1], mlp_model.predict_proba(x)[:, 1]))
+        meta_model.predict_proba(stack)
+    return (time.perf_counter() - start) / len(rows) * 1000
+
+
+def evaluate_k(k, method, X_train, X_test, y_train, y_test, params):
+    emb_cols = embedding_columns(X_train)
+    business_cols = [c for c in X_train.columns if c not in emb_cols]
+
+    projection = None
+    if k < len(emb_cols):
+        projection = fit_embedding_projection(X_train[emb_cols], k, method=method)
+
+    def model_input(X):
+        emb = X[emb_cols].to_numpy(dtype=np.float32)
+        if projection is not None:
+            emb = project_embeddings(projection, emb)
+        return np.hstack([X[business_cols].to_numpy(dtype=np.float64), emb])
+
+    A_train, A_test = model_input(X_train), model_input(X_test)
+
+    start = time.perf_counter()
+    xgb_model = xgb.XGBClassifier(random_state=42, eval_metric="logloss", n_jobs=-1, **params["xgboost"])
+    xgb_model.fit(A_train, y_train)
+    mlp_params = dict(params["neural_network"])
+    mlp_params["hidden_layer_sizes"] = tuple(mlp_params["hidden_layer_sizes"])
+    mlp_model = MLPClassifier(random_state=42, early_stopping=True, validation_fraction=0.1,
+                              n_iter_no_change=10, **mlp_params)
+    mlp_model.fit(A_train, y_train)
+    stack_train = np.column_stack((xgb_model.predict_proba(A_train)[:, 1], mlp_model.predict_proba(A_train)[:, 1]))
+    meta_model = LogisticRegression(max_iter=1000, random_state=42).fit(stack_train, y_train)
+    train_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    xgb_proba = xgb_model.predict_proba(A_test)[:, 1]
+    mlp_proba = mlp_model.predict_proba(A_test)[:, 1]
+    ensemble_proba = meta_model.predict_proba(np.column_stack((xgb_proba, mlp_proba)))[:, 1]
+    batch_us_per_row = (time.perf_counter() - start) / len(A_test) * 1e6
+
+    models = (xgb_model, mlp_model, meta_model, projection, business_cols, emb_cols)
+    return {
+        "k": k if projection is not None else len(emb_cols),
+        "n_features": A_train.shape[1],
+        "explained_var": None if projection is None else projection["explained_variance"],
+        "xgb_auc": roc_auc_score(y_test, xgb_proba),
+        "mlp_auc": roc_auc_score(y_test, mlp_proba),
+        "ensemble_auc": roc_auc_score(y_test, ensemble_proba),
+        "ensemble_acc": accuracy_score(y_test, (ensemble_proba >= 0.5).astype(int)),
+        "train_s": train_seconds,
+        "batch_us_per_row": batch_us_per_row,
+        "single_row_ms": single_row_latency_ms(models, X_test),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--k", type=int, nargs="+", default=[8, 16, 32, 64, 128, 768])
+    parser.add_argument("--method", choices=["pca", "random"], default="pca")
+    parser.add_argument("--data", default=os.path.join(ROOT, "data/processed/ecommerce_sales_with_embeddings.csv"))
+    args = parser.parse_args()
+
+    if not os.path.exists(args.data):
+        sys.exit(f"{args.data} not found, run notebooks/text_processing.ipynb first")
+
+    with open(os.path.join(ROOT, "models/optimized/optimization_results.json")) as f:
+        results = json.load(f)
+    params = {
+        "xgboost": results["xgboost"]["best_params"],
+        "neural_network": results["neural_network"]["best_params"],
+    }
+
+    df = pd.read_csv(args.data)
+    X = df.drop(columns=["success"])
+    y = df["success"]
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, stratify=y, random_state=42)
+
+    rows = []
+    for k in args.k:
+        rows.append(evaluate_k(k, args.method, X_train, X_test, y_train, y_test, params))
+        print(rows[-1])
+
+    print()
+    print(pd.DataFrame(rows).round(4).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
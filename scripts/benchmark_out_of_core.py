@@ -0,0 +1,142 @@
+"""
+Throughput and peak memory of out-of-core vs in-memory training.
+
+Generates a synthetic embeddings-shaped CSV (28 business columns + 768 emb_*
+columns + success) unless --data is given, then trains the stacked ensemble
+both ways, each in a fresh subprocess so peak RSS is measured per mode.
+
+Usage:
+    uv run python scripts/benchmark_out_of_core.py --rows 200000 --max-memory-mb 256 512
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+
+def make_dataset(path, rows, chunk_rows=20000, seed=0):
+    rng = np.random.default_rng(seed)
+    business = [f"feature_{i}" for i in range(28)]
+    emb = [f"emb_{i}" for i in range(768)]
+    for start in range(0, rows, chunk_rows):
+        n = min(chunk_rows, rows - start)
+        X = rng.normal(size=(n, len(business) + len(emb))).astype(np.float32)
+        logits = X[:, :5].sum(axis=1) + 0.5 * X[:, 28:38].sum(axis=1)
+        df = pd.DataFrame(X, columns=business + emb)
+        df["success"] = (logits + rng.normal(size=n) > 0).astype(int)
+        df.to_csv(path, mode="w" if start == 0 else "a", header=start == 0, index=False)
+
+
+def load_params():
+    with open(os.path.join(ROOT, "models/optimized/optimization_results.json")) as f:
+        best = json.load(f)
+    return best["xgboost"]["best_params"], best["neural_network"]["best_params"]
+
+
+def run_in_memory(data, mlp_epochs):
+    import xgboost as xgb
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.metrics import roc_auc_score
+    from sklearn.model_selection import train_test_split
+    from sklearn.neural_network import MLPClassifier
+
+    xgb_params, mlp_params = load_params()
+    mlp_params = dict(mlp_params, max_iter=mlp_epochs, hidden_layer_sizes=tuple(mlp_params["hidden_layer_sizes"]))
+
+    df = pd.read_csv(data)
+    X = df.drop(columns=["success"]).to_numpy(dtype=np.float32)
+    y = df["success"].to_numpy()
+    del df
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, stratify=y, random_state=42)
+
+    xgb_model = xgb.XGBClassifier(random_state=42, eval_metric="logloss", tree_method="hist", **xgb_params)
+    xgb_model.fit(X_train, y_train)
+    mlp_model = MLPClassifier(random_state=42, **mlp_params).fit(X_train, y_train)
+    stack = np.column_stack((xgb_model.predict_proba(X_train)[:, 1], mlp_model.predict_proba(X_train)[:, 1]))
+    meta_model = LogisticRegression(max_iter=1000).fit(stack, y_train)
+    proba = meta_model.predict_proba(np.column_stack((
+        xgb_model.predict_proba(X_test)[:, 1], mlp_model.predict_proba(X_test)[:, 1],
+    )))[:, 1]
+    return len(y_train), roc_auc_score(y_test, proba)
+
+
+def run_out_of_core(data, mlp_epochs, max_memory_mb, n_folds):
+    from sklearn.metrics import roc_auc_score
+
+    from app.out_of_core import train_streaming
+
+    xgb_params, mlp_params = load_params()
+    result = train_streaming(data, xgb_params, mlp_params, max_memory_mb=max_memory_mb,
+                             n_folds=n_folds, mlp_epochs=mlp_epochs)
+    test = result["test"]
+    return result["stats"]["train_rows"], roc_auc_score(test["y"], test["ensemble"])
+
+
+def child(args):
+    start = time.perf_counter()
+    if args.mode == "in-memory":
+        n_train, auc = run_in_memory(args.data, args.mlp_epochs)
+    else:
+        n_train, auc = run_out_of_core(args.data, args.mlp_epochs, args.max_memory_mb[0], args.n_folds)
+    seconds = time.perf_counter() - start
+    # ru_maxrss is in kB on Linux
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({"seconds": seconds, "train_rows": n_train, "auc": auc, "peak_rss_mb": peak_mb}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--data", default=None)
+    parser.add_argument("--max-memory-mb", type=int, nargs="+", default=[256, 1024])
+    parser.add_argument("--n-folds", type=int, default=3)
+    parser.add_argument("--mlp-epochs", type=int, default=5)
+    parser.add_argument("--mode", choices=["in-memory", "out-of-core"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        return child(args)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data = args.data
+        if data is None:
+            data = os.path.join(tmp, "synthetic.csv")
+            print(f"Generating {args.rows} synthetic rows...")
+            make_dataset(data, args.rows)
+
+        runs = [("in-memory", None)] + [("out-of-core", mb) for mb in args.max_memory_mb]
+        rows = []
+        for mode, mb in runs:
+            cmd = [sys.executable, __file__, "--mode", mode, "--data", data,
+                   "--mlp-epochs", str(args.mlp_epochs), "--n-folds", str(args.n_folds)]
+            if mb:
+                cmd += ["--max-memory-mb", str(mb)]
+            out = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+            result = json.loads(out.strip().splitlines()[-1])
+            rows.append({
+                "mode": mode,
+                "max_memory_mb": mb,
+                "seconds": round(result["seconds"], 1),
+                "rows_per_s": round(result["train_rows"] / result["seconds"]),
+                "peak_rss_mb": round(result["peak_rss_mb"]),
+                "ensemble_auc": round(result["auc"], 4),
+            })
+            print(rows[-1])
+
+    print()
+    print(pd.DataFrame(rows).to_string(index=False))
+    print("\nOut-of-core also fits n_folds extra base-model pairs for out-of-fold stacking.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark total memory and throughput of app/serve.py as the worker count grows.
+
+For each worker count the server is started, warmed up and hit with concurrent
+/predict requests. RSS double-counts pages shared copy-on-write between the
+parent and workers, PSS splits them, so the PSS total is the real footprint.
+
+Usage (Linux only, needs /proc):
+    uv run python scripts/benchmark_workers.py --workers 1 2 4 8 --requests 400
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from app.serve import process_memory  # noqa: E402
+
+
+def child_pids(pid):
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(p) for p in f.read().split()]
+    except OSError:
+        return []
+
+
+def wait_until_ready(url, timeout=300):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(url, timeout=2)
+            return True
+        except OSError:
+            time.sleep(0.5)
+    return False
+
+
+def post_predict(url, product_name):
+    body = json.dumps({"product_name": product_name}).encode()
+    req = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(req, timeout=60) as resp:
+        resp.read()
+
+
+def run_load(url, names, n_requests, concurrency):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(lambda i: post_predict(url, names[i % len(names)]), range(n_requests)))
+    return n_requests / (time.perf_counter() - start)
+
+
+def benchmark(workers, port, n_requests, concurrency, names):
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "app.serve", "--workers", str(workers), "--port", str(port)],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        base = f"http://127.0.0.1:{port}"
+        if not wait_until_ready(base + "/"):
+            raise RuntimeError(f"server with {workers} workers did not come up")
+        # Warm up every worker before measuring
+        run_load(base + "/predict", names, workers * 4, workers)
+        throughput = run_load(base + "/predict", names, n_requests, concurrency)
+
+        pids = [proc.pid] + child_pids(proc.pid)
+        memory = [process_memory(pid) for pid in pids]
+        return {
+            "workers": workers,
+            "req_per_s": round(throughput, 1),
+            "rss_total_mb": round(sum(m["rss_kb"] for m in memory) / 1024, 1),
+            "pss_total_mb": round(sum(m["pss_kb"] for m in memory) / 1024, 1),
+        }
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    names = pd.read_csv(os.path.join(ROOT, "data/raw/ecommerce_sales.csv"))["product_name"].tolist()
+
+    results = []
+    for workers in args.workers:
+        results.append(benchmark(workers, args.port, args.requests, args.concurrency, names))
+        print(results[-1])
+
+    print()
+    print(pd.DataFrame(results).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
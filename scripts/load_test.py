@@ -0,0 +1,161 @@
+"""
+Open-loop overload test for /predict.
+
+Requests arrive at a fixed --rate for --duration seconds regardless of how fast
+the server answers, as real traffic does. Above the server's capacity the queue
+grows without bound unless admission control sheds the excess. Latency is
+measured from each request's scheduled send time, so client-side waiting counts
+too. Reports latency percentiles of successful requests plus shed (503) and
+deadline (504) counts. With --compare it starts `uvicorn app.api:app` itself,
+once with admission control off and once on.
+
+Usage:
+    uv run python scripts/load_test.py --compare --rate 300 --duration 20
+    uv run python scripts/load_test.py --url http://localhost:8000 --rate 300   # against a running server
+"""
+import argparse
+import collections
+import http.client
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def sender(url, schedule, timeout_ms, results, lock):
+    parts = urllib.parse.urlsplit(url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=120)
+    headers = {"Content-Type": "application/json"}
+    if timeout_ms:
+        headers["X-Request-Timeout-Ms"] = str(timeout_ms)
+    while True:
+        item = schedule.get()
+        if item is None:
+            break
+        scheduled, name = item
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        try:
+            conn.request("POST", "/predict", body=json.dumps({"product_name": name}), headers=headers)
+            response = conn.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=120)
+            status = "error"
+        with lock:
+            results.append((status, (time.perf_counter() - scheduled) * 1000))
+    conn.close()
+
+
+def run_load(url, names, rate, duration, timeout_ms, senders):
+    results, lock = [], threading.Lock()
+    schedule = queue.Queue()
+    start = time.perf_counter() + 0.5
+    n_requests = int(rate * duration)
+    for i in range(n_requests):
+        schedule.put((start + i / rate, names[i % len(names)]))
+    for _ in range(senders):
+        schedule.put(None)
+    threads = [threading.Thread(target=sender, args=(url, schedule, timeout_ms, results, lock)) for _ in range(senders)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    counts = collections.Counter(status for status, _ in results)
+    ok = np.array([ms for status, ms in results if status == 200]) if counts[200] else np.zeros(1)
+    return {
+        "requests": len(results),
+        "ok": counts[200],
+        "shed_503": counts[503],
+        "deadline_504": counts[504],
+        "other": len(results) - counts[200] - counts[503] - counts[504],
+        "ok_per_s": round(counts[200] / elapsed, 1),
+        "p50_ms": round(float(np.percentile(ok, 50)), 1),
+        "p99_ms": round(float(np.percentile(ok, 99)), 1),
+        "max_ms": round(float(ok.max()), 1),
+    }
+
+
+def fetch_json(url, path):
+    parts = urllib.parse.urlsplit(url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=10)
+    try:
+        conn.request("GET", path)
+        return json.loads(conn.getresponse().read())
+    finally:
+        conn.close()
+
+
+def start_server(port, env):
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.api:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(600):
+        try:
+            fetch_json(url, "/admission/stats")
+            return process, url
+        except (OSError, ValueError):
+            if process.poll() is not None:
+                raise RuntimeError("Server exited during startup")
+            time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError("Server didn't start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--compare", action="store_true", help="start the server with admission control off, then on")
+    parser.add_argument("--port", type=int, default=8765, help="port for --compare servers")
+    parser.add_argument("--rate", type=float, default=300, help="requests per second, pick one above capacity")
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--senders", type=int, default=256, help="client threads; enough to keep up with --rate")
+    parser.add_argument("--timeout-ms", type=int, default=2000, help="X-Request-Timeout-Ms sent by clients (0: none)")
+    parser.add_argument("--max-in-flight", type=int, default=None, help="MAX_IN_FLIGHT for --compare servers")
+    args = parser.parse_args()
+
+    names = pd.read_csv(os.path.join(ROOT, "data/raw/ecommerce_sales.csv"))["product_name"].unique().tolist()
+
+    rows = []
+    if not args.compare:
+        rows.append({"server": args.url, **run_load(args.url, names, args.rate, args.duration, args.timeout_ms, args.senders)})
+        print(json.dumps(fetch_json(args.url, "/admission/stats"), indent=2))
+    else:
+        for enabled in ("0", "1"):
+            env = dict(os.environ, ADMISSION_CONTROL=enabled)
+            if args.max_in_flight:
+                env["MAX_IN_FLIGHT"] = str(args.max_in_flight)
+            process, url = start_server(args.port, env)
+            try:
+                run_load(url, names, 10, 1, args.timeout_ms, 4)  # warm up
+                result = run_load(url, names, args.rate, args.duration, args.timeout_ms, args.senders)
+                rows.append({"admission_control": enabled == "1", **result})
+                print(rows[-1])
+                if enabled == "1":
+                    print(json.dumps(fetch_json(url, "/admission/stats"), indent=2))
+            finally:
+                process.terminate()
+                process.wait()
+
+    print()
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
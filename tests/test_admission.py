@@ -0,0 +1,106 @@
+import asyncio
+import time
+
+import pytest
+
+from app.admission import (
+    MAX_TIMEOUT_MS,
+    AdmissionController,
+    DeadlineExceeded,
+    Overloaded,
+    check_deadline,
+    parse_timeout_ms,
+    reset_deadline,
+    set_deadline,
+)
+
+
+@pytest.mark.parametrize("value", ["nan", "inf", "-inf", "0", "-5", "soon"])
+def test_timeout_header_must_be_positive_and_finite(value):
+    with pytest.raises(ValueError):
+        parse_timeout_ms(value)
+
+
+def test_timeout_header_is_capped():
+    assert parse_timeout_ms("250") == 250.0
+    assert parse_timeout_ms(str(MAX_TIMEOUT_MS * 10)) == MAX_TIMEOUT_MS
+    assert 0 < parse_timeout_ms(None) <= MAX_TIMEOUT_MS
+
+
+def test_queue_is_fifo_and_release_hands_over_the_slot():
+    async def scenario():
+        controller = AdmissionController(max_in_flight=1, max_queue=2)
+        assert await controller.acquire() == 0.0
+        order = []
+
+        async def waiter(name):
+            await controller.acquire()
+            order.append(name)
+
+        tasks = [asyncio.create_task(waiter(name)) for name in ("first", "second")]
+        await asyncio.sleep(0)
+        assert controller.snapshot()["queue_length"] == 2
+
+        controller.release(0.01)
+        await asyncio.sleep(0)
+        assert order == ["first"] and controller.in_flight == 1
+        controller.release(0.01)
+        await asyncio.gather(*tasks)
+        assert order == ["first", "second"] and controller.in_flight == 1
+        controller.release(0.01)
+        assert controller.in_flight == 0 and controller.queued == 2
+
+    asyncio.run(scenario())
+
+
+def test_full_queue_is_shed_with_503():
+    async def scenario():
+        controller = AdmissionController(max_in_flight=1, max_queue=0)
+        await controller.acquire()
+        with pytest.raises(Overloaded) as e:
+            await controller.acquire()
+        assert e.value.status_code == 503 and e.value.retry_after >= 1
+        assert controller.shed_queue_full == 1
+
+    asyncio.run(scenario())
+
+
+def test_passed_or_unmeetable_deadline_is_shed_with_504():
+    async def scenario():
+        controller = AdmissionController(max_in_flight=1, max_queue=4)
+        with pytest.raises(Overloaded) as e:
+            await controller.acquire(time.monotonic() - 1)
+        assert e.value.status_code == 504
+
+        await controller.acquire()
+        controller.service_ms = 1000.0  # the slot frees in ~1s, too late for 50ms
+        with pytest.raises(Overloaded) as e:
+            await controller.acquire(time.monotonic() + 0.05)
+        assert e.value.status_code == 504
+        assert controller.shed_deadline == 2 and controller.queued == 0
+
+    asyncio.run(scenario())
+
+
+def test_deadline_passing_in_the_queue_leaves_it():
+    async def scenario():
+        controller = AdmissionController(max_in_flight=1, max_queue=4)
+        await controller.acquire()
+        with pytest.raises(Overloaded) as e:
+            await controller.acquire(time.monotonic() + 0.02)
+        assert e.value.status_code == 504
+        assert controller.snapshot()["queue_length"] == 0
+        controller.release()
+        assert controller.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_check_deadline_raises_once_out_of_time():
+    check_deadline("no deadline set")
+    token = set_deadline(time.monotonic() - 0.001)
+    try:
+        with pytest.raises(DeadlineExceeded, match="ensemble"):
+            check_deadline("ensemble")
+    finally:
+        reset_deadline(token)
@@ -0,0 +1,190 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.analytics import ProductRanking
+
+CATEGORIES = ["Books", "Clothing", "Toys"]
+
+
+def make_catalog(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(
+        {
+            "product_id": np.arange(1, n + 1),
+            "product_name": [f"Product {i}" for i in range(n)],
+            "category": rng.choice(CATEGORIES, n),
+            "price": rng.uniform(5, 500, n),
+            "review_score": rng.uniform(1, 5, n),
+            "review_count": rng.integers(0, 1000, n).astype(float),
+        }
+    )
+    for m in range(1, 13):
+        df[f"sales_month_{m}"] = rng.uniform(0, 1000, n)
+    return df
+
+
+def expected_ids(df, metric, k, direction, category=None):
+    """Brute-force ranking straight from the frame"""
+    if category is not None:
+        df = df[df["category"] == category]
+    monthly = df[[f"sales_month_{m}" for m in range(1, 13)]].to_numpy()
+    values = {
+        "total_sales": monthly.sum(axis=1),
+        "sales_per_dollar": monthly.sum(axis=1) / df["price"].to_numpy(),
+        "review_score": df["review_score"].to_numpy(),
+    }[metric]
+    order = np.argsort(-values if direction == "top" else values, kind="stable")
+    return df["product_id"].to_numpy()[order[:k]].tolist()
+
+
+def ranked_ids(ranking, metric, k, direction, category=None):
+    products = ranking.query(metric, k=k, direction=direction, category=category)
+    return [p["product_id"] for p in products]
+
+
+def test_price_update_does_not_touch_the_source_frame():
+    df = make_catalog()
+    before = df.copy()
+    ranking = ProductRanking(df)
+
+    ranking.update_product(1, price=123.0)
+    ranking.update_product(2, monthly_sales=[10.0] * 12)
+
+    pd.testing.assert_frame_equal(df, before)
+    assert ranking.price[0] == 123.0
+    assert ranking.keys["total_sales"][1] == 120.0
+
+
+def test_update_with_sales_and_price_applies_both():
+    df = make_catalog()
+    ranking = ProductRanking(df)
+    ranking.query("total_sales", k=5, direction="top")
+
+    result = ranking.update_product(7, monthly_sales=[1e6] * 12, price=10.0)
+
+    assert result["total_sales"] == 12e6
+    assert result["price"] == 10.0
+    assert ranked_ids(ranking, "total_sales", 1, "top") == [7]
+    assert ranked_ids(ranking, "sales_per_dollar", 1, "top") == [7]
+
+
+@pytest.mark.parametrize(
+    "update",
+    [
+        {"monthly_sales": [5.0] * 12, "price": float("nan")},
+        {"monthly_sales": [5.0] * 12, "price": -1.0},
+        {"monthly_sales": [5.0] * 11, "price": 10.0},
+        {"monthly_sales": [float("inf")] + [5.0] * 11},
+    ],
+)
+def test_rejected_update_changes_nothing(update):
+    df = make_catalog()
+    ranking = ProductRanking(df)
+    top = ranked_ids(ranking, "total_sales", 10, "top")
+    monthly, price = ranking.monthly.copy(), ranking.price.copy()
+    keys = {name: values.copy() for name, values in ranking.keys.items()}
+
+    with pytest.raises(ValueError):
+        ranking.update_product(3, **update)
+
+    np.testing.assert_array_equal(ranking.monthly, monthly)
+    np.testing.assert_array_equal(ranking.price, price)
+    for name, values in keys.items():
+        np.testing.assert_array_equal(ranking.keys[name], values)
+    assert ranked_ids(ranking, "total_sales", 10, "top") == top
+
+
+def test_unknown_product_and_metric():
+    ranking = ProductRanking(make_catalog())
+    with pytest.raises(KeyError):
+        ranking.update_product(99999, price=1.0)
+    with pytest.raises(ValueError):
+        ranking.query("nope")
+    with pytest.raises(KeyError):
+        ranking.query("total_sales", category="Garden")
+
+
+def test_heaps_match_brute_force_through_random_updates():
+    df = make_catalog(n=200, seed=1)
+    ranking = ProductRanking(df, heap_size=15)
+    rng = np.random.default_rng(2)
+    sales_cols = [f"sales_month_{m}" for m in range(1, 13)]
+    queries = [
+        (metric, k, direction, category)
+        for metric in ("total_sales", "sales_per_dollar", "review_score")
+        for k in (1, 5, 15, 40)
+        for direction in ("top", "bottom")
+        for category in (None, "Toys")
+    ]
+
+    for step in range(150):
+        row = int(rng.integers(len(df)))
+        product_id = int(df.at[row, "product_id"])
+        # Mix of moves into, out of and within the extremes
+        monthly = rng.uniform(0, 1000, 12) * rng.choice([0.01, 1.0, 3.0])
+        price = float(rng.uniform(5, 500))
+        ranking.update_product(product_id, monthly_sales=monthly, price=price)
+        df.loc[row, sales_cols] = monthly
+        df.loc[row, "price"] = price
+
+        if step % 10 == 0:
+            for metric, k, direction, category in queries:
+                assert ranked_ids(
+                    ranking, metric, k, direction, category
+                ) == expected_ids(df, metric, k, direction, category), (
+                    step,
+                    metric,
+                    k,
+                    direction,
+                    category,
+                )
+
+
+def test_heap_never_grows_past_its_cap():
+    ranking = ProductRanking(make_catalog(n=100), heap_size=10)
+    ranking.query("total_sales", k=10, direction="top")
+    for product_id in range(1, 101):
+        ranking.update_product(product_id, monthly_sales=[float(product_id)] * 12)
+    heap = ranking._heaps[("total_sales", -1, "top")]
+    assert len(heap) <= 10
+    assert ranked_ids(ranking, "total_sales", 3, "top") == [100, 99, 98]
+
+
+def test_percentages_rescale_by_current_maximum():
+    ranking = ProductRanking(make_catalog(n=50))
+    ranking.update_product(5, monthly_sales=[1e5] * 12)
+    best = ranking.query("selling_percentage", k=2, direction="top")
+    assert best[0]["product_id"] == 5
+    assert best[0]["selling_percentage"] == 100.0
+    assert best[1]["selling_percentage"] < 100.0
+
+
+def test_quantile_filter_matches_the_notebook():
+    df = make_catalog()
+    ranking = ProductRanking(df)
+    total = df[[f"sales_month_{m}" for m in range(1, 13)]].sum(axis=1)
+    selling_percentage = total / total.max() * 100
+
+    result = ranking.quantile_filter("selling_percentage", q=0.2, k=15)
+    threshold = selling_percentage.quantile(0.2)
+    assert result["threshold"] == pytest.approx(threshold)
+    assert result["count"] == int((selling_percentage <= threshold).sum())
+    assert [p["product_id"] for p in result["products"]] == expected_ids(
+        df, "total_sales", 15, "bottom"
+    )
+
+    top = ranking.quantile_filter("total_sales", q=0.1, k=1000, direction="top")
+    assert top["count"] == int((total >= total.quantile(0.9)).sum())
+    assert len(top["products"]) == top["count"]
+
+
+def test_k_beyond_the_heap_cap_falls_back_to_argpartition():
+    df = make_catalog()
+    ranking = ProductRanking(df, heap_size=5)
+    assert ranked_ids(ranking, "total_sales", 50, "top") == expected_ids(
+        df, "total_sales", 50, "top"
+    )
+    assert ranked_ids(ranking, "review_score", 40, "bottom", "Toys") == expected_ids(
+        df, "review_score", 40, "bottom", "Toys"
+    )
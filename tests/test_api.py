@@ -0,0 +1,120 @@
+"""Endpoint tests; they need the full serving stack and the trained model files"""
+
+import os
+
+import pytest
+
+for module in ("torch", "transformers", "xgboost", "httpx"):
+    pytest.importorskip(module)
+
+MODEL_DIR = os.path.join(os.path.dirname(__file__), "..", "models", "optimized")
+MODEL_FILES = [
+    "xgboost_optimized.pkl",
+    "neural_network_optimized.pkl",
+    "meta_model_optimized.pkl",
+]
+if not all(os.path.exists(os.path.join(MODEL_DIR, f)) for f in MODEL_FILES):
+    pytest.skip("trained models not available", allow_module_level=True)
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import api  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def client():
+    return TestClient(api.app)
+
+
+def test_sales_update_with_price_reranks_products(client):
+    product_id = int(api.lookup_df["product_id"].iloc[0])
+    response = client.post(
+        f"/analytics/products/{product_id}/sales",
+        json={"monthly_sales": [1e6] * 12, "price": 1.0},
+    )
+    assert response.status_code == 200, response.text
+    assert response.json()["total_sales"] == 12e6
+
+    top = client.get(
+        "/analytics/top-performers", params={"metric": "total_sales", "k": 1}
+    ).json()
+    assert top["products"][0]["product_id"] == product_id
+
+
+def test_rejected_sales_update_is_not_half_applied(client):
+    product_id = int(api.lookup_df["product_id"].iloc[1])
+    name = str(api.lookup_df["product_name"].iloc[1])
+    before = client.post("/forecast", json={"product_name": name}).json()
+
+    response = client.post(
+        f"/analytics/products/{product_id}/sales",
+        json={"monthly_sales": [5.0] * 12, "price": -3.0},
+    )
+    assert response.status_code == 400
+    assert client.post("/forecast", json={"product_name": name}).json() == before
+
+
+def test_batch_agrees_with_single_predictions(client):
+    names = api.lookup_df["product_name"].drop_duplicates().head(5).tolist()
+    row = api.lookup_df.iloc[0]
+    raw = {
+        "product_name": str(row["product_name"]),
+        "product_id": int(row["product_id"]),
+        "category": row["category"],
+        "price": float(row["price"]),
+        "review_score": float(row["review_score"]),
+        "review_count": float(row["review_count"]),
+        "monthly_sales": [float(row[f"sales_month_{m + 1}"]) for m in range(12)],
+    }
+    single = [
+        client.post("/predict", json={"product_name": name}).json() for name in names
+    ]
+
+    # Name-only rows of a mixed batch still come from the catalog
+    response = client.post(
+        "/predict/batch",
+        json={"products": [{"product_name": name} for name in names] + [raw]},
+    )
+    assert response.status_code == 200, response.text
+    results = response.json()["results"]
+    for expected, got in zip(single, results):
+        assert got["success_probability"] == pytest.approx(
+            expected["success_probability"], abs=1e-4
+        )
+        assert got["stage"] == expected["stage"]
+    # The first catalog row described by its raw features scores like its name
+    assert results[-1]["success_probability"] == pytest.approx(
+        single[0]["success_probability"], abs=1e-4
+    )
+
+
+def test_batch_raw_row_without_name_or_embedding_is_400(client):
+    response = client.post(
+        "/predict/batch",
+        json={"products": [{"product_name": "Hoodie"}, {"price": 10.0}]},
+    )
+    assert response.status_code == 400
+
+
+def test_batch_null_month_is_400_naming_row_and_column(client):
+    row = {
+        "product_name": "Custom",
+        "category": "Toys",
+        "price": 12.0,
+        "review_score": 3.0,
+        "review_count": 10.0,
+        "monthly_sales": [50.0] * 4 + [None] + [50.0] * 7,
+    }
+    response = client.post("/predict/batch", json={"products": [row]})
+    assert response.status_code == 400
+    assert "Row 0: sales_month_5" in response.json()["detail"]
+
+
+@pytest.mark.parametrize("timeout", ["nan", "inf", "-1", "0"])
+def test_invalid_request_timeout_is_400(client, timeout):
+    response = client.post(
+        "/predict",
+        json={"product_name": "Hoodie"},
+        headers={"X-Request-Timeout-Ms": timeout},
+    )
+    assert response.status_code == 400
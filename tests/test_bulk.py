@@ -0,0 +1,238 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.bulk import (
+    BUSINESS_COLUMNS,
+    ModelLayout,
+    ProductCatalog,
+    batch_features,
+    check_feature_scaling,
+    json_columns,
+    load_feature_scaling,
+    make_feature_scaling,
+    save_feature_scaling,
+)
+
+MONTHS = [f"sales_month_{m + 1}" for m in range(12)]
+SCALING = make_feature_scaling(
+    [250.0, 3.0, 500.0, 6000.0, 500.0],
+    [150.0, 1.0, 300.0, 1000.0, 80.0],
+    [160.0, 320.0],
+    BUSINESS_COLUMNS + ["emb_0", "emb_1"],
+)
+
+
+@pytest.fixture
+def catalog():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(
+        {
+            "product_id": [1, 2, 3],
+            "product_name": ["Hoodie", "Kettle", "Laptop"],
+            "category": ["Clothing", "Home & Kitchen", "Electronics"],
+            "price": [40.0, 25.0, 900.0],
+            "review_score": [4.1, 3.5, 4.8],
+            "review_count": [120.0, 40.0, 800.0],
+        }
+    )
+    for col in MONTHS:
+        df[col] = rng.integers(100, 900, len(df)).astype(float)
+    return ProductCatalog(df, SCALING)
+
+
+def raw_row(name=None):
+    return {
+        "product_name": name,
+        "product_id": 7,
+        "category": "Toys",
+        "price": 12.0,
+        "review_score": 3.0,
+        "review_count": 10.0,
+        "monthly_sales": [50.0] * 12,
+    }
+
+
+def json_body(products):
+    return json.dumps({"products": products}).encode()
+
+
+def arrow_body(table):
+    import pyarrow as pa
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def test_mixed_json_batch_resolves_each_row(catalog):
+    columns = json_columns(
+        json_body(
+            [{"product_name": "Kettle"}, raw_row("Custom"), {"product_name": "nope"}]
+        )
+    )
+    features, found = batch_features(columns, catalog)
+
+    np.testing.assert_array_equal(found, [True, True, False])
+    np.testing.assert_array_equal(features[0], catalog.features[1])
+    raw_only, _ = batch_features(json_columns(json_body([raw_row("Custom")])), catalog)
+    np.testing.assert_array_equal(features[1], raw_only[0])
+
+
+def test_mixed_arrow_batch_matches_json(catalog):
+    pa = pytest.importorskip("pyarrow")
+    from app.bulk import read_arrow_columns
+
+    raw = raw_row("Custom")
+    table = pa.table(
+        {
+            "product_name": ["Kettle", "Custom"],
+            "product_id": [None, raw["product_id"]],
+            "category": [None, raw["category"]],
+            "price": [None, raw["price"]],
+            "review_score": [None, raw["review_score"]],
+            "review_count": [None, raw["review_count"]],
+            "monthly_sales": [None, raw["monthly_sales"]],
+        }
+    )
+    arrow_features, found = batch_features(
+        read_arrow_columns(arrow_body(table)), catalog
+    )
+
+    json_features, _ = batch_features(
+        json_columns(json_body([{"product_name": "Kettle"}, raw])), catalog
+    )
+    assert found.all()
+    np.testing.assert_allclose(arrow_features, json_features)
+
+
+def test_raw_row_without_name_or_embedding_is_rejected(catalog):
+    columns = json_columns(json_body([{"product_name": "Kettle"}, raw_row()]))
+    with pytest.raises(ValueError, match="Row 1 has no embedding"):
+        batch_features(columns, catalog)
+
+
+def test_raw_row_with_embedding_needs_no_name(catalog):
+    products = [
+        dict(raw_row(), embedding=[0.0] * 4),
+        dict(raw_row(), embedding=[1.0] * 4),
+    ]
+    features, found = batch_features(json_columns(json_body(products)), catalog)
+    assert found.all() and features.shape[0] == 2
+
+
+def test_row_with_neither_name_nor_features_is_rejected(catalog):
+    columns = json_columns(json_body([{"product_name": "Kettle"}, {}]))
+    with pytest.raises(ValueError, match="Row 1 needs product_name"):
+        batch_features(columns, catalog)
+
+
+def test_feature_scaling_round_trips_and_drives_the_features(tmp_path, catalog):
+    save_feature_scaling(SCALING, tmp_path)
+    scaling = load_feature_scaling(tmp_path)
+    assert scaling == SCALING
+    assert scaling["feature_names"] == BUSINESS_COLUMNS
+
+    price = catalog.features[:, BUSINESS_COLUMNS.index("price")]
+    np.testing.assert_allclose(price, (np.array([40.0, 25.0, 900.0]) - 250.0) / 150.0)
+    high = catalog.features[:, BUSINESS_COLUMNS.index("price_bucket_High")]
+    np.testing.assert_array_equal(high, [0.0, 0.0, 1.0])
+
+
+def test_missing_feature_scaling_fails_loudly(tmp_path):
+    with pytest.raises(FileNotFoundError, match="train stage"):
+        load_feature_scaling(tmp_path)
+
+
+def test_feature_scaling_must_match_the_model():
+    names = BUSINESS_COLUMNS + ["emb_0", "emb_1"]
+    check_feature_scaling(SCALING, ModelLayout(names, len(names), 2))
+
+    other = [name for name in names if name != "product_id"]
+    with pytest.raises(ValueError, match="same training run"):
+        check_feature_scaling(SCALING, ModelLayout(other, len(other), 2))
+    with pytest.raises(ValueError, match="business inputs"):
+        check_feature_scaling(SCALING, ModelLayout(None, len(names) + 1, 2))
+
+
+def with_value(row, field, value):
+    row = dict(row)
+    if field.startswith("sales_month_"):
+        month = int(field[len("sales_month_") :]) - 1
+        row["monthly_sales"] = [
+            value if m == month else v for m, v in enumerate(row["monthly_sales"])
+        ]
+    else:
+        row[field] = value
+    return row
+
+
+BAD_VALUES = [
+    ("price", None),
+    ("price", float("nan")),
+    ("review_count", float("inf")),
+    ("sales_month_5", None),
+    ("sales_month_5", float("nan")),
+    ("sales_month_12", float("-inf")),
+]
+
+
+@pytest.mark.parametrize("field,value", BAD_VALUES)
+def test_json_rejects_missing_or_non_finite_raw_values(catalog, field, value):
+    products = [raw_row("Custom"), with_value(raw_row("Custom"), field, value)]
+    with pytest.raises(ValueError, match=f"Row 1: {field} is missing or not a finite"):
+        batch_features(json_columns(json_body(products)), catalog)
+
+
+@pytest.mark.parametrize("field,value", BAD_VALUES)
+@pytest.mark.parametrize("monthly_layout", ["columns", "list"])
+def test_arrow_rejects_missing_or_non_finite_raw_values(
+    catalog, field, value, monthly_layout
+):
+    pa = pytest.importorskip("pyarrow")
+    from app.bulk import read_arrow_columns
+
+    rows = [raw_row("Custom"), with_value(raw_row("Custom"), field, value)]
+    data = {
+        name: [row[name] for row in rows]
+        for name in (
+            "product_name",
+            "product_id",
+            "category",
+            "price",
+            "review_score",
+            "review_count",
+        )
+    }
+    if monthly_layout == "list":
+        data["monthly_sales"] = [row["monthly_sales"] for row in rows]
+    else:
+        for m in range(12):
+            data[f"sales_month_{m + 1}"] = [row["monthly_sales"][m] for row in rows]
+    table = pa.table(data)
+    with pytest.raises(ValueError, match=f"Row 1: {field} is missing or not a finite"):
+        batch_features(read_arrow_columns(arrow_body(table)), catalog)
+
+
+def test_missing_monthly_sales_is_rejected_on_both_paths(catalog):
+    pa = pytest.importorskip("pyarrow")
+    from app.bulk import read_arrow_columns
+
+    row = {k: v for k, v in raw_row("Custom").items() if k != "monthly_sales"}
+    with pytest.raises(ValueError, match="Row 0: sales_month_1 is missing"):
+        batch_features(json_columns(json_body([row])), catalog)
+    table = pa.table({k: [v] for k, v in row.items()})
+    with pytest.raises(ValueError, match="Row 0: sales_month_1 is missing"):
+        batch_features(read_arrow_columns(arrow_body(table)), catalog)
+
+
+def test_non_finite_embedding_is_rejected(catalog):
+    products = [
+        dict(raw_row(), embedding=[0.0] * 4),
+        dict(raw_row(), embedding=[float("nan")] * 4),
+    ]
+    with pytest.raises(ValueError, match="Row 1: embedding"):
+        batch_features(json_columns(json_body(products)), catalog)
@@ -0,0 +1,136 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.bulk import BUSINESS_COLUMNS, ModelLayout
+from app.cascade import (
+    CascadeStats,
+    calibrate_cascade_bands,
+    calibrate_on_holdout,
+    evaluate_cascade_bands,
+    served_proba,
+    xgb_used_features,
+)
+
+
+def disagreement(bands, xgb_proba, ensemble_proba):
+    exited = (xgb_proba <= bands["low"]) | (xgb_proba >= bands["high"])
+    return ((xgb_proba >= 0.5) != (ensemble_proba >= 0.5)) & exited
+
+
+def test_bands_respect_disagreement_budget():
+    rng = np.random.default_rng(0)
+    ensemble = rng.random(2000)
+    xgb = np.clip(ensemble + rng.normal(0, 0.1, len(ensemble)), 0, 1)
+
+    for budget in (0.0, 0.01, 0.05):
+        bands = calibrate_cascade_bands(xgb, ensemble, max_disagreement=budget)
+        assert bands["low"] < 0.5 <= bands["high"]
+        assert disagreement(bands, xgb, ensemble).sum() <= int(budget * len(xgb))
+
+
+def test_bigger_budget_exits_more():
+    rng = np.random.default_rng(1)
+    ensemble = rng.random(1000)
+    xgb = np.clip(ensemble + rng.normal(0, 0.15, len(ensemble)), 0, 1)
+
+    rates = [
+        calibrate_cascade_bands(xgb, ensemble, max_disagreement=b)["calibration"][
+            "short_circuit_rate"
+        ]
+        for b in (0.0, 0.02, 0.1)
+    ]
+    assert rates == sorted(rates)
+    assert rates[-1] > rates[0]
+
+
+def test_agreeing_models_exit_everything():
+    proba = np.linspace(0, 1, 101)
+    bands = calibrate_cascade_bands(proba, proba, max_disagreement=0.0)
+    assert bands["calibration"]["short_circuit_rate"] == 1.0
+    assert bands["calibration"]["disagreement_rate"] == 0.0
+
+
+def test_tied_probabilities_are_not_split():
+    # Exiting any of the tied 0.2s means exiting all of them, two of which disagree
+    xgb = np.array([0.1, 0.2, 0.2, 0.2, 0.9])
+    ensemble = np.array([0.1, 0.6, 0.6, 0.1, 0.9])
+    bands = calibrate_cascade_bands(xgb, ensemble, max_disagreement=0.2)
+    assert bands["low"] == 0.1
+    assert disagreement(bands, xgb, ensemble).sum() <= 1
+
+
+def test_holdout_evaluation_uses_unseen_rows():
+    rng = np.random.default_rng(2)
+    ensemble = rng.random(4000)
+    xgb = np.clip(ensemble + rng.normal(0, 0.1, len(ensemble)), 0, 1)
+
+    bands = calibrate_on_holdout(xgb, ensemble, max_disagreement=0.01)
+    evaluation = bands["evaluation"]
+    assert bands["calibration"]["n"] + evaluation["n"] == len(xgb)
+    assert 0.3 < bands["calibration"]["n"] / len(xgb) < 0.7
+    # Same bands scored on all rows sit between the two halves' rates
+    everything = evaluate_cascade_bands(bands, xgb, ensemble)
+    rates = sorted(
+        [bands["calibration"]["disagreement_rate"], evaluation["disagreement_rate"]]
+    )
+    assert rates[0] <= everything["disagreement_rate"] <= rates[1]
+
+
+def test_embedding_columns_found_by_name():
+    xgb = pytest.importorskip("xgboost")
+    rng = np.random.default_rng(3)
+    columns = BUSINESS_COLUMNS + [f"emb_{i}" for i in range(4)]
+    X = pd.DataFrame(rng.random((300, len(columns))), columns=columns)
+    y = (X["total_sales"] > 0.5).astype(int)
+    model = xgb.XGBClassifier(n_estimators=5, max_depth=2).fit(X, y)
+
+    layout = ModelLayout.from_model(model, embedding_dim=4)
+    assert layout.embedding_positions.tolist() == [28, 29, 30, 31]
+    used = xgb_used_features(model)
+    assert columns.index("total_sales") in used
+    # total_sales sits at column 16, inside the old range(15, 15 + dim) guess
+    assert not used & set(layout.embedding_positions.tolist())
+
+
+def test_unnamed_model_embedding_is_trailing_columns():
+    layout = ModelLayout(None, n_features=len(BUSINESS_COLUMNS) + 8, embedding_dim=8)
+    assert layout.embedding_positions.tolist() == list(range(28, 36))
+    assert layout.business_positions.tolist() == list(range(28))
+    with pytest.raises(ValueError):
+        ModelLayout(None, n_features=10, embedding_dim=64)
+
+
+def test_stats_count_exits_and_saved_latency():
+    stats = CascadeStats()
+    stats.record_full(0.010)
+    stats.record_exit()
+    stats.record_batch(n_exit=3, n_full=2, expensive_stage_seconds=0.020)
+    snapshot = stats.snapshot()
+    assert snapshot["total"] == 7
+    assert snapshot["short_circuited"] == 4
+    assert snapshot["estimated_latency_saved_ms"] == pytest.approx(
+        4 * snapshot["avg_skipped_stage_ms"]
+    )
+
+
+def test_seeded_stats_credit_exits_before_any_full_run():
+    stats = CascadeStats()
+    stats.seed(12.0)
+    for _ in range(5):
+        stats.record_exit()
+    stats.record_batch(n_exit=5, n_full=0, expensive_stage_seconds=0.0)
+    assert stats.snapshot()["estimated_latency_saved_ms"] == pytest.approx(120.0)
+
+    # Measured full runs take over from the seed
+    stats.seed(99.0)
+    assert stats.skipped_stage_ms == 12.0
+
+
+def test_served_proba_takes_xgboost_only_on_early_exits():
+    bands = {"low": 0.2, "high": 0.8}
+    xgb = np.array([0.1, 0.5, 0.9, 0.2])
+    ensemble = np.array([0.3, 0.6, 0.7, 0.4])
+    np.testing.assert_array_equal(
+        served_proba(bands, xgb, ensemble), [0.1, 0.6, 0.9, 0.2]
+    )
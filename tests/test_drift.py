@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+from app.drift import FEATURES, DriftMonitor, fit_drift_baseline, psi
+
+
+def training_columns(n=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    return {name: rng.normal(10.0, 2.0, n) for name in FEATURES}
+
+
+def sample(n, seed, shift=0.0):
+    rng = np.random.default_rng(seed)
+    return rng.normal(10.0 + shift, 2.0, (n, len(FEATURES)))
+
+
+@pytest.fixture
+def monitor():
+    return DriftMonitor(
+        fit_drift_baseline(training_columns()), interval=3600, min_samples=200
+    )
+
+
+def test_psi_is_zero_for_equal_distributions_and_grows_with_shift():
+    expected = np.full(10, 0.1)
+    assert psi(expected, expected) == 0.0
+    shifted = np.array([0.0] * 5 + [0.2] * 5)
+    assert psi(expected, shifted) > psi(expected, (expected + shifted) / 2) > 0
+
+
+def test_baseline_bins_hold_the_training_mass():
+    baseline = fit_drift_baseline(training_columns(), n_bins=20)
+    spec = baseline["features"]["price"]
+    assert len(spec["proportions"]) == len(spec["edges"]) + 1
+    assert sum(spec["proportions"]) == pytest.approx(1.0)
+    assert spec["mean"] == pytest.approx(10.0, abs=0.1)
+
+
+def test_same_distribution_is_not_drifted(monitor):
+    monitor.record(sample(2000, seed=1))
+    report = monitor.roll_window()
+    for stats in report["features"].values():
+        assert not stats["drifted"]
+        assert stats["psi"] < 0.05 and stats["ks"] <= stats["ks_critical"]
+
+
+def test_shifted_distribution_is_drifted(monitor):
+    monitor.record(sample(2000, seed=1, shift=2.0))
+    report = monitor.roll_window()
+    price = report["features"]["price"]
+    assert price["drifted"] and price["psi"] >= 0.2
+    assert price["mean_shift_std"] == pytest.approx(1.0, abs=0.1)
+
+
+def test_single_rows_and_batches_count_alike(monitor):
+    values = sample(300, seed=2)
+    for row in values:
+        monitor.record(row)
+    rows = monitor.roll_window()
+
+    batched = DriftMonitor(monitor.baseline, interval=3600, min_samples=200)
+    batched.record(values)
+    assert batched.roll_window()["features"] == rows["features"]
+
+
+def test_reports_wait_for_min_samples(monitor):
+    monitor.record(sample(50, seed=3))
+    assert monitor.roll_window() is None
+    assert monitor.snapshot()["since_start"] is None
+
+    monitor.record(sample(200, seed=4))
+    snapshot = monitor.snapshot()
+    assert snapshot["since_start"]["features"]["price"]["count"] == 250
+
+
+def test_non_finite_rows_are_counted_not_summed(monitor):
+    values = sample(300, seed=5)
+    bad = values[:3].copy()
+    bad[0, 0], bad[1, 1], bad[2, 2] = np.nan, np.inf, -np.inf
+    monitor.record(values)
+    monitor.record(bad)
+    monitor.record(bad[0])
+    report = monitor.roll_window()
+    assert report["non_finite"] == 4
+    assert report["features"]["price"]["count"] == 300
+
+    monitor.record(sample(300, seed=6))
+    since_start = monitor.snapshot()["since_start"]
+    assert since_start["non_finite"] == 4
+    for stats in since_start["features"].values():
+        assert np.isfinite(stats["mean"]) and np.isfinite(stats["std"])
+    assert "feature_drift_non_finite_rows 4" in monitor.prometheus()
@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+from app.forecasting import backtest, forecast, seasonal_naive_forecast
+
+
+def test_seasonal_naive_repeats_last_season():
+    Y = np.arange(24, dtype=float)[None, :]
+    np.testing.assert_array_equal(seasonal_naive_forecast(Y, 3), [[12.0, 13.0, 14.0]])
+
+
+def test_seasonal_naive_rejects_short_history():
+    with pytest.raises(ValueError, match="12 months"):
+        forecast(np.ones((2, 9)), 3, "seasonal_naive")
+
+
+def test_backtest_reports_seasonal_naive_unavailable():
+    Y = np.random.default_rng(0).poisson(50, size=(20, 12)).astype(float)
+    results = backtest(Y, holdout=3)
+    assert results["seasonal_naive"] == {
+        "note": "unavailable: needs 12 months of history, backtest leaves 9"
+    }
+    assert np.isfinite(results["ses"]["mae"])
+    assert results["ses"]["note"] == ""
+
+
+def test_backtest_scores_seasonal_naive_with_a_full_season():
+    Y = np.tile(np.arange(12, dtype=float), 2)[None, :] + 1
+    results = backtest(Y, holdout=3)
+    assert results["seasonal_naive"]["mae"] == 0.0
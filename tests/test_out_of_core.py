@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("xgboost")
+pytest.importorskip("sklearn")
+
+from app.out_of_core import TEST_SPLIT, chunk_rows_for_budget, write_shards
+
+
+def write_csv(path, n_rows, n_emb=6, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(
+        {
+            "price": rng.random(n_rows),
+            "success": rng.integers(0, 2, n_rows),
+        }
+    )
+    for i in range(n_emb):
+        df[f"emb_{i}"] = rng.normal(size=n_rows)
+    df.to_csv(path, index=False)
+    return df
+
+
+def test_projection_is_fitted_on_every_training_row(tmp_path):
+    # 7-row chunks leave short batches and a 4-row training tail for k=5
+    df = write_csv(tmp_path / "data.csv", 35)
+    shards, projection, names = write_shards(
+        str(tmp_path / "data.csv"), str(tmp_path / "shards"), 7, embedding_k=5
+    )
+
+    train = np.concatenate([np.load(b + "_split.npy") for b in shards]) != TEST_SPLIT
+    emb = df[[f"emb_{i}" for i in range(6)]].to_numpy()[train]
+    np.testing.assert_allclose(projection["mean"], emb.mean(axis=0), rtol=1e-5)
+    assert projection["components"].shape == (5, 6)
+    assert names == ["price"] + [f"emb_pca_{i}" for i in range(5)]
+    assert np.load(shards[0] + "_X.npy").shape[1] == 6
+
+
+def test_too_few_rows_for_k_is_a_clear_error(tmp_path):
+    write_csv(tmp_path / "data.csv", 4)
+    with pytest.raises(ValueError, match="embedding_k=5"):
+        write_shards(
+            str(tmp_path / "data.csv"), str(tmp_path / "shards"), 256, embedding_k=5
+        )
+
+
+def test_without_projection_embeddings_pass_through(tmp_path):
+    write_csv(tmp_path / "data.csv", 30)
+    shards, projection, names = write_shards(
+        str(tmp_path / "data.csv"), str(tmp_path / "shards"), 8
+    )
+    assert projection is None
+    assert len(shards) == 4
+    assert sum(len(np.load(b + "_y.npy")) for b in shards) == 30
+    assert names[-1] == "emb_5"
+
+
+def test_chunk_rows_shrink_with_budget():
+    assert chunk_rows_for_budget(1024, 800) > chunk_rows_for_budget(64, 800) >= 256
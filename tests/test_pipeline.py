@@ -0,0 +1,131 @@
+import os
+
+import pytest
+
+from app.pipeline import Pipeline, Ref, Stage, file_hash, stage_key, topological_order
+
+
+def upper(inputs, outputs, params):
+    with open(inputs["text"]) as f, open(outputs["upper"], "w") as out:
+        out.write(f.read().upper())
+
+
+def repeat(inputs, outputs, params):
+    with open(inputs["upper"]) as f, open(outputs["repeated"], "w") as out:
+        out.write(f.read() * params["times"])
+
+
+def toy_stages(times=2, code=()):
+    return [
+        Stage(
+            "upper",
+            upper,
+            inputs={"text": "input.txt"},
+            outputs={"upper": None},
+            code=code,
+        ),
+        Stage(
+            "repeat",
+            repeat,
+            inputs={"upper": Ref("upper", "upper")},
+            outputs={"repeated": "out/repeated.txt"},
+            params={"times": times},
+        ),
+    ]
+
+
+def run(tmp_path, stage_list):
+    pipeline = Pipeline(
+        stage_list, root=str(tmp_path), cache_dir=str(tmp_path / "cache"), jobs=1
+    )
+    return {r["stage"]: r["status"] for r in pipeline.run()}
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    (tmp_path / "input.txt").write_text("abc")
+    return tmp_path
+
+
+def test_second_run_is_cached(workspace):
+    assert run(workspace, toy_stages()) == {"upper": "ran", "repeat": "ran"}
+    assert (workspace / "out" / "repeated.txt").read_text() == "ABCABC"
+    assert run(workspace, toy_stages()) == {"upper": "cache hit", "repeat": "cache hit"}
+
+
+def test_param_change_reruns_only_that_stage(workspace):
+    run(workspace, toy_stages())
+    assert run(workspace, toy_stages(times=3)) == {
+        "upper": "cache hit",
+        "repeat": "ran",
+    }
+    assert (workspace / "out" / "repeated.txt").read_text() == "ABCABCABC"
+
+
+def test_input_change_reruns_downstream(workspace):
+    run(workspace, toy_stages())
+    (workspace / "input.txt").write_text("xyz")
+    assert run(workspace, toy_stages()) == {"upper": "ran", "repeat": "ran"}
+    assert (workspace / "out" / "repeated.txt").read_text() == "XYZXYZ"
+
+
+def test_key_covers_inputs_params_and_helper_modules(tmp_path, monkeypatch):
+    helper = tmp_path / "pipeline_helper_mod.py"
+    helper.write_text("SCALE = 1\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    data = tmp_path / "data.txt"
+    data.write_text("abc")
+
+    stage = toy_stages(code=["pipeline_helper_mod"])[0]
+    key = stage_key(stage, {"text": str(data)})
+    assert stage_key(stage, {"text": str(data)}) == key
+
+    helper.write_text("SCALE = 2\n")
+    os.utime(helper, ns=(1, 1))
+    helper_key = stage_key(stage, {"text": str(data)})
+    assert helper_key != key
+
+    data.write_text("abd")
+    os.utime(data, ns=(1, 1))
+    assert stage_key(stage, {"text": str(data)}) not in (key, helper_key)
+
+    other = toy_stages(times=5)[1]
+    assert stage_key(other, {"upper": str(data)}) != stage_key(
+        toy_stages(times=6)[1], {"upper": str(data)}
+    )
+
+
+def test_unknown_helper_module_fails_loudly(tmp_path):
+    data = tmp_path / "data.txt"
+    data.write_text("abc")
+    stage = toy_stages(code=["no_such_module_for_pipeline_tests"])[0]
+    with pytest.raises(ValueError):
+        stage_key(stage, {"text": str(data)})
+
+
+def test_file_hash_follows_content(tmp_path):
+    path = tmp_path / "f.bin"
+    path.write_bytes(b"one")
+    first = file_hash(str(path))
+    path.write_bytes(b"two!")
+    assert file_hash(str(path)) != first
+
+
+def test_topological_order_and_cycles():
+    stage_list = toy_stages()
+    assert [s.name for s in topological_order(stage_list[::-1])] == ["upper", "repeat"]
+
+    stage_list[0].inputs = {"text": Ref("repeat", "repeated")}
+    with pytest.raises(ValueError, match="Cycle"):
+        topological_order(stage_list)
+
+
+def test_real_stages_list_their_helper_modules():
+    from app.pipeline import build_stages, module_path
+
+    for stage in build_stages() + build_stages(train_mode="out-of-core"):
+        for module in stage.code:
+            assert os.path.isfile(module_path(module))
+    by_name = {s.name: s for s in build_stages()}
+    assert "app.cascade" in by_name["train"].code
+    assert "app.drift" in by_name["drift_baseline"].code
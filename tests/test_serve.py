@@ -0,0 +1,61 @@
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("uvicorn")
+
+from app import admission, serve  # noqa: E402
+
+
+def test_restart_delay_backs_off_exponentially_up_to_the_cap():
+    delays = [serve.restart_delay(n) for n in range(10)]
+    assert delays[:4] == [
+        0.0,
+        serve.RESTART_BACKOFF_S,
+        2 * serve.RESTART_BACKOFF_S,
+        4 * serve.RESTART_BACKOFF_S,
+    ]
+    assert delays == sorted(delays)
+    assert delays[-1] == serve.MAX_RESTART_BACKOFF_S
+
+
+def test_rapid_failures_count_up_and_reset_after_a_healthy_run():
+    assert serve.count_rapid_failures(2, serve.MIN_UPTIME_S / 2) == 3
+    assert serve.count_rapid_failures(2, serve.MIN_UPTIME_S * 2) == 0
+    # An unknown pid isn't a failed start of ours
+    assert serve.count_rapid_failures(2, None) == 0
+
+
+def test_supervisor_gives_up_after_max_rapid_failures():
+    failures, restarts = 0, 0
+    while True:
+        failures = serve.count_rapid_failures(failures, 0.1)
+        if failures >= serve.MAX_RAPID_FAILURES:
+            break
+        restarts += 1
+    assert restarts == serve.MAX_RAPID_FAILURES - 1
+
+
+def test_threads_split_the_usable_cores(monkeypatch):
+    monkeypatch.setattr(serve, "available_cores", lambda: 8)
+    assert serve.default_threads_per_worker(4) == 2
+    assert serve.default_threads_per_worker(3) == 2
+    assert serve.default_threads_per_worker(16) == 1
+
+
+def test_available_cores_follows_the_affinity_mask(monkeypatch):
+    monkeypatch.setattr(
+        admission.os, "sched_getaffinity", lambda pid: {0, 2, 5}, raising=False
+    )
+    assert admission.available_cores() == 3
+    monkeypatch.delattr(admission.os, "sched_getaffinity")
+    monkeypatch.setattr(admission.os, "cpu_count", lambda: None)
+    assert admission.available_cores() == 1
+
+
+def test_limits_from_env(monkeypatch):
+    monkeypatch.delenv("MAX_IN_FLIGHT", raising=False)
+    monkeypatch.delenv("MAX_QUEUE", raising=False)
+    assert admission.limits_from_env(3) == (3, 12)
+    monkeypatch.setenv("MAX_IN_FLIGHT", "0")
+    monkeypatch.setenv("MAX_QUEUE", "-1")
+    assert admission.limits_from_env(3) == (1, 0)